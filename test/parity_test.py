@@ -5,31 +5,104 @@ Script to create test folders and generate jobdef files from JSON configuration
 
 import sys
 import argparse
+import fnmatch
+import re
 import subprocess
-import shutil
+import shlex
 import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path to import json2jobdef
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from utils.json2jobdef import process_single_entry, load_json, find_json_entry
+from utils.json2jobdef import process_single_entry, load_json, find_json_entry, resolve_input_paths
+from utils.prod_utils import scratch_cwd
 
 # File patterns for job definition outputs
 JOBDEF_FILE_PATTERNS = ['cnf.*.0.tar', 'cnf.*.0.fcl']
+_JOBDEF_FILE_RE = re.compile('|'.join(fnmatch.translate(p) for p in JOBDEF_FILE_PATTERNS))
+# stdout lines kept for error reports when a streamed command fails
+_STDOUT_TAIL_LINES = 200
+
+
+class ShellWorker:
+    """One long-lived bash that runs mu2ejobdef commands back to back, so a
+    full parity run pays shell startup once instead of once per config.
+
+    Each command's stderr goes to a scratch file and a sentinel line carrying
+    its exit code marks the end of its stdout. Commands run in the cwd the
+    worker was started in, one at a time: mu2ejobdef writes its cnf.* outputs
+    into cwd and move_jobdef_files sorts them by pattern, so concurrent
+    workers need separate cwds (see _create_jobdef_isolated).
+    """
+
+    def __init__(self):
+        self.proc = subprocess.Popen(['bash'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, env=os.environ.copy())
+        fd, self.stderr_path = tempfile.mkstemp(prefix='parity_stderr.')
+        os.close(fd)
+        self.count = 0
+
+    def run(self, command, stream=False):
+        """Run `command`; returns a CompletedProcess like subprocess.run.
+
+        With `stream`, stdout is echoed as it arrives and only its last
+        _STDOUT_TAIL_LINES lines are kept in the result."""
+        self.count += 1
+        sentinel = f"__PARITY_DONE_{self.count}__"
+        # A subshell (a fork, no exec) keeps `exit`, cd, export and set -e
+        # from leaking into the worker; stdin from /dev/null stops the
+        # command eating the scripted lines (sentinel included) off the
+        # shared pipe; the leading echo guarantees the sentinel starts its
+        # own line.
+        self.proc.stdin.write(
+            f"( {command}\n) </dev/null 2>{shlex.quote(self.stderr_path)}; "
+            f"rc=$?; echo; echo {sentinel} $rc\n"
+        )
+        self.proc.stdin.flush()
+
+        lines = deque(maxlen=_STDOUT_TAIL_LINES) if stream else []
+        for line in self.proc.stdout:
+            if line.startswith(sentinel):
+                returncode = int(line.split()[1])
+                break
+            if stream:
+                sys.stdout.write(line)
+            lines.append(line)
+        else:
+            raise RuntimeError(f"bash worker exited while running: {command}")
+
+        stderr = Path(self.stderr_path).read_text()
+        return subprocess.CompletedProcess(command, returncode, ''.join(lines), stderr)
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+        os.unlink(self.stderr_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 def move_jobdef_files(target_dir: Path):
     """Move job definition files to target directory using JOBDEF_FILE_PATTERNS."""
     # Create target directory if it doesn't exist
     target_dir.mkdir(parents=True, exist_ok=True)
     
-    # Move job definition files using specific patterns
-    for file_pattern in JOBDEF_FILE_PATTERNS:
-        for file_path in Path.cwd().glob(file_pattern):
-            if file_path.exists() and file_path.is_file():
-                shutil.move(str(file_path), str(target_dir / file_path.name))
-                print(f"    Moved {file_path.name} to {target_dir.name}/")
+    # One listing of cwd matched against all patterns; target_dir is a
+    # subdirectory, so a rename never has to fall back to copying.
+    with os.scandir('.') as it:
+        for entry in it:
+            if entry.is_file() and _JOBDEF_FILE_RE.match(entry.name):
+                os.replace(entry.path, target_dir / entry.name)
+                print(f"    Moved {entry.name} to {target_dir.name}/")
 
-def create_jobdef(config, json_file_path):
+def create_jobdef(config, json_file_path, worker):
     """Create jobdef for a single configuration using json2jobdef."""
     
     # Print the equivalent json2jobdef command that would be run
@@ -51,12 +124,12 @@ def create_jobdef(config, json_file_path):
     
     print(f"  📁 Moving Python files to python/ before running mu2ejobdef")
     move_jobdef_files(Path.cwd() / "python")
-    create_mu2ejobdef(result['perl_commands'])
+    create_mu2ejobdef(result['perl_commands'], worker)
     
     return True
 
-def create_mu2ejobdef(perl_commands):
-    """Execute mu2ejobdef commands for a single configuration."""
+def create_mu2ejobdef(perl_commands, worker):
+    """Execute mu2ejobdef commands for a single configuration on `worker`."""
     # Get the mu2ejobdef command (should be the first and only one)
     mu2ejobdef_cmd = [cmd for cmd in perl_commands if cmd['type'] == 'mu2ejobdef'][0]
     
@@ -65,17 +138,18 @@ def create_mu2ejobdef(perl_commands):
 
     print(f"      🐪 mu2ejobdef command: {command}")
     
-    # Don't source the setup script again since it's already sourced in the main shell
-    result = subprocess.run(command, shell=True, capture_output=True, text=True, env=os.environ.copy())
+    # Don't source the setup script again since it's already sourced in the main shell.
+    # stdout streams as mu2ejobdef runs; result.stdout holds only its tail.
+    sys.stdout.flush()
+    result = worker.run(command, stream=True)
     
     print(f"      Return code: {result.returncode}")
     print(f"      stderr: {result.stderr.strip()}")
-    print(f"      stdout: {result.stdout.strip()}")
     
     if result.returncode != 0:
         print(f"      ❌ Error: {result.stderr.strip()}")
         if result.stdout.strip():
-            print(f"      stdout: {result.stdout.strip()}")
+            print(f"      stdout (last {_STDOUT_TAIL_LINES} lines): {result.stdout.strip()}")
         return False
     else:
         print(f"      ✅ mu2ejobdef completed successfully")
@@ -85,15 +159,40 @@ def create_mu2ejobdef(perl_commands):
     
     return True
 
-def create_jobdefs_from_json(json_file, index=None):
+def _create_jobdef_isolated(config, json_file, root):
+    """Process-pool body for `--jobs N`: run create_jobdef for one config in
+    a private scratch dir under `root` with its own ShellWorker, then move
+    the python/ and perl/ results into `root`'s python/ and perl/."""
+    with scratch_cwd(root, 'parity.', keep=['python', 'perl']):
+        with ShellWorker() as worker:
+            return create_jobdef(config, json_file, worker)
+
+def create_jobdefs_from_json(json_file, index=None, jobs=1):
     """Create jobdef files for configurations in JSON file using Python json2jobdef.py.
     
     Args:
         json_file: Path to JSON configuration file
         index: Optional index to process only one specific configuration
+        jobs: Process up to this many configurations in parallel (all-configs mode only)
     """
     print(f"Processing configurations from {json_file}")
     configs = load_json(Path(json_file))
+
+    if index is None and jobs > 1:
+        root = os.getcwd()
+        # Workers build in scratch dirs, so pin relative sources to cwd now
+        configs = [resolve_input_paths(c) for c in configs]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_create_jobdef_isolated, configs,
+                                        [json_file] * len(configs), [root] * len(configs)))
+        print(f"{sum(results)}/{len(configs)} jobdefs successfully processed")
+        return True
+
+    with ShellWorker() as worker:
+        return _create_jobdefs(configs, json_file, index, worker)
+
+def _create_jobdefs(configs, json_file, index, worker):
+    """Body of create_jobdefs_from_json, run against one shared `worker`."""
     total_count = len(configs)
     
     if index is not None:
@@ -110,7 +209,7 @@ def create_jobdefs_from_json(json_file, index=None):
             Path('template.fcl').unlink()
             print(f"  🧹 Cleaned up template.fcl from previous configuration")
         
-        if create_jobdef(config, json_file):
+        if create_jobdef(config, json_file, worker):
             print(f"✅ Successfully processed configuration {index}: {config['desc']}")
             return True
         else:
@@ -119,15 +218,15 @@ def create_jobdefs_from_json(json_file, index=None):
     else:
         # Process all configurations
         success_count = 0
-        for i in range(total_count):
-            config = find_json_entry(configs=configs, index=i)
+        # configs is the already-loaded list; walk it directly
+        for config in configs:
             
             # Clean up template.fcl from previous iteration to avoid interference
             if Path('template.fcl').exists():
                 Path('template.fcl').unlink()
                 print(f"  🧹 Cleaned up template.fcl from previous configuration")
             
-            if create_jobdef(config, json_file):
+            if create_jobdef(config, json_file, worker):
                 success_count += 1
         
         print(f"{success_count}/{total_count} jobdefs successfully processed")
@@ -147,11 +246,15 @@ Examples:
   
   # Test only the third configuration (index 2)
   python parity_test.py --json ../data/mix.json --index 2
+  
+  # Test all configurations, four at a time
+  python parity_test.py --json ../data/mix.json --jobs 4
         """,
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     parser.add_argument("--json", required=True, help="JSON configuration file")
     parser.add_argument("--index", type=int, help="Process only the specified configuration index (0-based). If not specified, processes all configurations.")
+    parser.add_argument("--jobs", type=int, default=1, help="Process up to N configurations in parallel when --index is not given (default: 1)")
     
     args = parser.parse_args()
     
@@ -159,7 +262,7 @@ Examples:
     for folder in ["python", "perl"]:
         Path(folder).mkdir(parents=True, exist_ok=True)
     
-    if not create_jobdefs_from_json(args.json, args.index):
+    if not create_jobdefs_from_json(args.json, args.index, jobs=args.jobs):
         return 1
     
     return 0
@@ -8,14 +8,20 @@ samweb_client. This provides a regression baseline before adding new features
 
 Run with:  python -m pytest test/test_unit.py -v
        or: python test/test_unit.py
+ parallel: python -m pytest -n auto test/test_unit.py   (needs pytest-xdist)
+
+Tests that write files do so in their own temporary directory, so the
+suite is safe to split across xdist worker processes.
 """
 
+import functools
 import hashlib
 import io
 import json
 import os
 import sys
 import tarfile
+import types
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -33,41 +39,43 @@ _STUB_MODULES = [
 ]
 for _mod in _STUB_MODULES:
     if _mod not in sys.modules:
-        sys.modules[_mod] = MagicMock()
+        sys.modules[_mod] = types.ModuleType(_mod)
+# The only attribute production code touches; tests patch it per case.
+if not hasattr(sys.modules['samweb_client'], 'SAMWebClient'):
+    sys.modules['samweb_client'].SAMWebClient = MagicMock()
 
 from utils.job_common import Mu2eFilename, remove_storage_prefix, Mu2eJobBase
+from utils.jobfcl import Mu2eJobFCL
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _make_tarball(jobpars: dict, fcl_content: str = "#include \"base.fcl\"\n") -> str:
+def _make_tarball(jobpars, fcl_content: str = "#include \"base.fcl\"\n") -> str:
     """
-    Build an in-memory tarball containing jobpars.json + mu2e.fcl and write
-    it to a temporary file.  Returns the path to the .tar file.
+    Build a tarball containing jobpars.json + mu2e.fcl, written straight to
+    a temporary file.  Returns the path to the .tar file.
+
+    `jobpars` is a dict, or already-encoded bytes from _jobpars_bytes.
 
     The file is placed in /tmp and must be removed by the caller if desired.
     """
     import tempfile
-    buf = io.BytesIO()
-    with tarfile.open(fileobj=buf, mode='w') as tar:
-        # Add jobpars.json
-        jp_bytes = json.dumps(jobpars).encode()
-        ti = tarfile.TarInfo(name='jobpars.json')
-        ti.size = len(jp_bytes)
-        tar.addfile(ti, io.BytesIO(jp_bytes))
-        # Add mu2e.fcl
-        fcl_bytes = fcl_content.encode()
-        ti2 = tarfile.TarInfo(name='mu2e.fcl')
-        ti2.size = len(fcl_bytes)
-        tar.addfile(ti2, io.BytesIO(fcl_bytes))
-    buf.seek(0)
-
-    tmp = tempfile.NamedTemporaryFile(suffix='.tar', delete=False)
-    tmp.write(buf.read())
-    tmp.close()
-    return tmp.name
+    fd, path = tempfile.mkstemp(suffix='.tar')
+    with os.fdopen(fd, 'wb') as tmp:
+        with tarfile.open(fileobj=tmp, mode='w') as tar:
+            # Add jobpars.json
+            jp_bytes = jobpars if isinstance(jobpars, bytes) else json.dumps(jobpars).encode()
+            ti = tarfile.TarInfo(name='jobpars.json')
+            ti.size = len(jp_bytes)
+            tar.addfile(ti, io.BytesIO(jp_bytes))
+            # Add mu2e.fcl
+            fcl_bytes = fcl_content.encode()
+            ti2 = tarfile.TarInfo(name='mu2e.fcl')
+            ti2.size = len(fcl_bytes)
+            tar.addfile(ti2, io.BytesIO(fcl_bytes))
+    return path
 
 
 def _root_input_jobpars(files, merge=1, run=1430, owner='mu2e', dsconf='TestConf'):
@@ -117,6 +125,26 @@ def _empty_event_jobpars(run=1430, events=1000, owner='mu2e', dsconf='TestConf')
     }
 
 
+@functools.lru_cache(maxsize=32)
+def _jobpars_bytes(kind, files=(), merge=1, run=1430, owner='mu2e', dsconf='TestConf'):
+    """Encoded jobpars.json for a 'root_input' or 'empty_event' job; cached
+    since many tests build tarballs from identical, unmodified jobpars."""
+    if kind == 'root_input':
+        jp = _root_input_jobpars(list(files), merge=merge, run=run, owner=owner, dsconf=dsconf)
+    else:
+        jp = _empty_event_jobpars(run=run, owner=owner, dsconf=dsconf)
+    return json.dumps(jp).encode()
+
+
+@functools.lru_cache(maxsize=None)
+def _empty_event_job(owner='mu2e', dsconf='TestConf'):
+    """Shared read-only EmptyEvent (run 1430) Mu2eJobFCL, one per
+    (owner, dsconf). Built from the jobpars dict via json_data, with no
+    tarball: sequencer/job_outputs never read mu2e.fcl."""
+    jp = _empty_event_jobpars(run=1430, owner=owner, dsconf=dsconf)
+    return Mu2eJobFCL(jp['jobname'], inloc='dir:/tmp', json_data=jp)
+
+
 # ---------------------------------------------------------------------------
 # 1. Mu2eFilename (job_common.py)
 # ---------------------------------------------------------------------------
@@ -448,16 +476,13 @@ class TestRemoveStoragePrefix(unittest.TestCase):
 class TestMyRandom(unittest.TestCase):
     """_my_random is accessed via Mu2eJobBase (parent of Mu2eJobFCL)."""
 
-    def setUp(self):
-        # Use a minimal concrete subclass to access the method
-        class _Stub(Mu2eJobBase):
-            def _extract_json(self):
-                return {}
-        # _Stub needs a real (dummy) tarball path; we just test the hash method
-        self._stub = object.__new__(_Stub)
+    @classmethod
+    def setUpClass(cls):
+        # json_data skips the tarball read; only the hash method is under test
+        cls._job = Mu2eJobBase('unused.tar', json_data={})
 
     def _rand(self, *args):
-        return Mu2eJobBase._my_random(self._stub, *args)
+        return self._job._my_random(*args)
 
     def test_deterministic(self):
         a = self._rand(5, "file1.art", "file2.art")
@@ -485,15 +510,16 @@ class TestMyRandom(unittest.TestCase):
 class TestLocateFile(unittest.TestCase):
     """Tests for _locate_file without SAM (uses dir: prefix)."""
 
-    def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
+    @classmethod
+    def setUpClass(cls):
         files = ["sim.mu2e.Test.MDC2025ac.001430_00000000.art"]
-        jp = _root_input_jobpars(files)
-        self.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
-        self.Cls = Mu2eJobFCL
+        jp = _jobpars_bytes('root_input', tuple(files))
+        cls.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
+        cls.Cls = Mu2eJobFCL
 
-    def tearDown(self):
-        os.unlink(self.tar)
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tar)
 
     def test_dir_prefix_no_sam(self):
         job = self.Cls(self.tar, inloc='dir:/data/inputs', proto='file')
@@ -514,78 +540,76 @@ class TestLocateFile(unittest.TestCase):
 class TestLocateFileSAM(unittest.TestCase):
     """Tests for _locate_file when SAM is involved (mocked)."""
 
-    def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
+    @classmethod
+    def setUpClass(cls):
         files = ["sim.mu2e.Test.MDC2025ac.001430_00000000.art"]
-        jp = _root_input_jobpars(files)
-        self.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
-        self.Cls = Mu2eJobFCL
+        jp = _jobpars_bytes('root_input', tuple(files))
+        cls.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
+        cls.Cls = Mu2eJobFCL
 
-    def tearDown(self):
-        os.unlink(self.tar)
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tar)
 
-    def _make_sam_client(self, locations):
-        mock_client = MagicMock()
-        mock_client.locateFile.return_value = locations
-        return mock_client
+    def setUp(self):
+        # One patched SAMWebClient per test; each test only sets its answers
+        patcher = patch('samweb_client.SAMWebClient')
+        self.sam = patcher.start().return_value
+        self.addCleanup(patcher.stop)
 
     def test_tape_location_preferred(self):
-        locations = [
+        self.sam.locateFile.return_value = [
             {'location_type': 'disk', 'full_path': '/pnfs/mu2e/persistent/datasets/phy-sim/f.art'},
             {'location_type': 'tape', 'full_path': '/pnfs/mu2e/tape/phy-sim/f.art'},
         ]
-        with patch('samweb_client.SAMWebClient', return_value=self._make_sam_client(locations)):
-            job = self.Cls(self.tar, inloc='tape', proto='file')
-            path = job._locate_file("f.art")
+        job = self.Cls(self.tar, inloc='tape', proto='file')
+        path = job._locate_file("f.art")
         self.assertEqual(path, '/pnfs/mu2e/tape/phy-sim/f.art')
 
     def test_disk_location_preferred(self):
-        locations = [
+        self.sam.locateFile.return_value = [
             {'location_type': 'disk', 'full_path': '/pnfs/mu2e/persistent/datasets/phy-sim/f.art'},
             {'location_type': 'tape', 'full_path': '/pnfs/mu2e/tape/phy-sim/f.art'},
         ]
-        with patch('samweb_client.SAMWebClient', return_value=self._make_sam_client(locations)):
-            job = self.Cls(self.tar, inloc='disk', proto='file')
-            path = job._locate_file("f.art")
+        job = self.Cls(self.tar, inloc='disk', proto='file')
+        path = job._locate_file("f.art")
         self.assertEqual(path, '/pnfs/mu2e/persistent/datasets/phy-sim/f.art')
 
     def test_fallback_to_first_when_no_match(self):
         """When requested location_type isn't found, fall back to first entry."""
-        locations = [
+        self.sam.locateFile.return_value = [
             {'location_type': 'tape', 'full_path': '/pnfs/mu2e/tape/phy-sim/f.art'},
         ]
-        with patch('samweb_client.SAMWebClient', return_value=self._make_sam_client(locations)):
-            job = self.Cls(self.tar, inloc='disk', proto='file')
-            path = job._locate_file("f.art")
+        job = self.Cls(self.tar, inloc='disk', proto='file')
+        path = job._locate_file("f.art")
         self.assertEqual(path, '/pnfs/mu2e/tape/phy-sim/f.art')
 
     def test_no_locations_raises(self):
-        with patch('samweb_client.SAMWebClient', return_value=self._make_sam_client([])):
-            job = self.Cls(self.tar, inloc='tape', proto='file')
-            with self.assertRaises(ValueError):
-                job._locate_file("f.art")
+        self.sam.locateFile.return_value = []
+        job = self.Cls(self.tar, inloc='tape', proto='file')
+        with self.assertRaises(ValueError):
+            job._locate_file("f.art")
 
     def test_sam_exception_raises(self):
-        mock_client = MagicMock()
-        mock_client.locateFile.side_effect = Exception("SAM unavailable")
-        with patch('samweb_client.SAMWebClient', return_value=mock_client):
-            job = self.Cls(self.tar, inloc='tape', proto='file')
-            with self.assertRaises(ValueError):
-                job._locate_file("f.art")
+        self.sam.locateFile.side_effect = Exception("SAM unavailable")
+        job = self.Cls(self.tar, inloc='tape', proto='file')
+        with self.assertRaises(ValueError):
+            job._locate_file("f.art")
 
 
 class TestFormatFilename(unittest.TestCase):
     """Tests for _format_filename protocol handling."""
 
-    def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
+    @classmethod
+    def setUpClass(cls):
         files = ["sim.mu2e.Test.MDC2025ac.001430_00000000.art"]
-        jp = _root_input_jobpars(files)
-        self.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
-        self.Cls = Mu2eJobFCL
+        jp = _jobpars_bytes('root_input', tuple(files))
+        cls.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
+        cls.Cls = Mu2eJobFCL
 
-    def tearDown(self):
-        os.unlink(self.tar)
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tar)
 
     def test_file_proto_returns_physical_path(self):
         job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
@@ -620,7 +644,6 @@ class TestFormatFilename(unittest.TestCase):
         mock_client = MagicMock()
         mock_client.locateFile.return_value = locations
         with patch('samweb_client.SAMWebClient', return_value=mock_client):
-            from utils.jobfcl import Mu2eJobFCL
             job = Mu2eJobFCL(self.tar, inloc='tape', proto='root')
             result = job._format_filename("f.art")
         self.assertTrue(result.startswith("xroot://fndcadoor.fnal.gov//pnfs/"))
@@ -632,55 +655,49 @@ class TestFormatFilename(unittest.TestCase):
 
 class TestJobPrimaryInputs(unittest.TestCase):
 
-    def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
-        self.files = [
+    @classmethod
+    def setUpClass(cls):
+        cls.files = [
             "sim.mu2e.Test.MDC2025ac.001430_%08d.art" % i for i in range(10)
         ]
-        jp = _root_input_jobpars(self.files, merge=2)
-        self.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
-        self.Cls = Mu2eJobFCL
-
-    def tearDown(self):
-        os.unlink(self.tar)
+        jp = _root_input_jobpars(cls.files, merge=2)
+        # Input selection reads only jobpars, so no tarball is needed.
+        # Mu2eJobFCL is read-only once built; every test here uses the same inloc
+        cls.job = Mu2eJobFCL(jp['jobname'], inloc='dir:/tmp', json_data=jp)
 
     def test_first_job_gets_first_merge_files(self):
-        job = self.Cls(self.tar, inloc='dir:/tmp')
+        job = self.job
         result = job.job_primary_inputs(0)
         self.assertEqual(result['source.fileNames'], self.files[0:2])
 
     def test_second_job_gets_next_slice(self):
-        job = self.Cls(self.tar, inloc='dir:/tmp')
+        job = self.job
         result = job.job_primary_inputs(1)
         self.assertEqual(result['source.fileNames'], self.files[2:4])
 
     def test_last_job(self):
-        job = self.Cls(self.tar, inloc='dir:/tmp')
+        job = self.job
         result = job.job_primary_inputs(4)
         self.assertEqual(result['source.fileNames'], self.files[8:10])
 
     def test_out_of_range_raises(self):
-        job = self.Cls(self.tar, inloc='dir:/tmp')
+        job = self.job
         with self.assertRaises(ValueError):
             job.job_primary_inputs(5)
 
     def test_njobs_correct(self):
-        job = self.Cls(self.tar, inloc='dir:/tmp')
+        job = self.job
         self.assertEqual(job.njobs(), 5)
 
 
 class TestJobPrimaryInputsMergeOne(unittest.TestCase):
     """Edge case: merge=1 (each job gets exactly 1 file)."""
 
-    def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
-        self.files = ["sim.mu2e.T.MDC2025ac.001430_%08d.art" % i for i in range(3)]
-        jp = _root_input_jobpars(self.files, merge=1)
-        self.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
-        self.job = Mu2eJobFCL(self.tar, inloc='dir:/tmp')
-
-    def tearDown(self):
-        os.unlink(self.tar)
+    @classmethod
+    def setUpClass(cls):
+        cls.files = ["sim.mu2e.T.MDC2025ac.001430_%08d.art" % i for i in range(3)]
+        jp = _root_input_jobpars(cls.files, merge=1)
+        cls.job = Mu2eJobFCL(jp['jobname'], inloc='dir:/tmp', json_data=jp)
 
     def test_each_job_gets_one_file(self):
         for i, f in enumerate(self.files):
@@ -691,124 +708,90 @@ class TestJobPrimaryInputsMergeOne(unittest.TestCase):
         self.assertEqual(self.job.njobs(), 3)
 
 
+def _aux_jobpars(aux_files, nreq, sequential):
+    """Return a jobpars.json dict for an EmptyEvent job with one auxin list."""
+    return {
+        "code": "",
+        "setup": "/cvmfs/test/setup.sh",
+        "tbs": {
+            "seed": "services.SeedService.baseSeed",
+            "subrunkey": "source.firstSubRun",
+            "event_id": {"source.firstRun": 1430, "source.maxEvents": 1000},
+            "outfiles": {"outputs.Out.fileName": "sim.mu2e.T.TC.sequencer.art"},
+            "auxin": {
+                "physics.producers.gen.fileNames": [nreq, aux_files]
+            },
+            "sequential_aux": sequential,
+        },
+        "jobname": "cnf.mu2e.T.TC.0.tar",
+        "owner": "mu2e",
+        "dsconf": "TC",
+    }
+
+
 class TestJobAuxInputsRandom(unittest.TestCase):
     """Auxiliary inputs in random (default) mode."""
 
-    def _make_job_with_aux(self, aux_files, nreq=2):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = {
-            "code": "",
-            "setup": "/cvmfs/test/setup.sh",
-            "tbs": {
-                "seed": "services.SeedService.baseSeed",
-                "subrunkey": "source.firstSubRun",
-                "event_id": {"source.firstRun": 1430, "source.maxEvents": 1000},
-                "outfiles": {"outputs.Out.fileName": "sim.mu2e.T.TC.sequencer.art"},
-                "auxin": {
-                    "physics.producers.gen.fileNames": [nreq, aux_files]
-                },
-                "sequential_aux": False,
-            },
-            "jobname": "cnf.mu2e.T.TC.0.tar",
-            "owner": "mu2e",
-            "dsconf": "TC",
-        }
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        return Mu2eJobFCL(tar, inloc='dir:/tmp'), tar
+    FILES = ["aux_%02d.art" % i for i in range(10)]
+    NREQ = 4
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tar = _make_tarball(_aux_jobpars(cls.FILES, cls.NREQ, sequential=False),
+                                "module_type : EmptyEvent\n")
+        cls.job = Mu2eJobFCL(cls.tar, inloc='dir:/tmp')
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tar)
 
     def test_deterministic_selection(self):
-        files = ["aux_%02d.art" % i for i in range(10)]
-        job, tar = self._make_job_with_aux(files, nreq=3)
-        try:
-            r1 = job.job_aux_inputs(0)
-            r2 = job.job_aux_inputs(0)
-            self.assertEqual(r1, r2)
-        finally:
-            os.unlink(tar)
+        r1 = self.job.job_aux_inputs(0)
+        r2 = self.job.job_aux_inputs(0)
+        self.assertEqual(r1, r2)
 
     def test_different_indices_different_selection(self):
-        files = ["aux_%02d.art" % i for i in range(10)]
-        job, tar = self._make_job_with_aux(files, nreq=3)
-        try:
-            r0 = job.job_aux_inputs(0)
-            r1 = job.job_aux_inputs(1)
-            self.assertNotEqual(r0, r1)
-        finally:
-            os.unlink(tar)
+        r0 = self.job.job_aux_inputs(0)
+        r1 = self.job.job_aux_inputs(1)
+        self.assertNotEqual(r0, r1)
 
     def test_no_duplicates_in_selection(self):
-        files = ["aux_%02d.art" % i for i in range(10)]
-        job, tar = self._make_job_with_aux(files, nreq=5)
-        try:
-            result = job.job_aux_inputs(0)
-            selected = result['physics.producers.gen.fileNames']
-            self.assertEqual(len(selected), len(set(selected)))
-        finally:
-            os.unlink(tar)
+        for index in range(3):
+            with self.subTest(index=index):
+                selected = self.job.job_aux_inputs(index)['physics.producers.gen.fileNames']
+                self.assertEqual(len(selected), len(set(selected)))
 
     def test_correct_count_returned(self):
-        files = ["aux_%02d.art" % i for i in range(10)]
-        job, tar = self._make_job_with_aux(files, nreq=4)
-        try:
-            result = job.job_aux_inputs(0)
-            self.assertEqual(len(result['physics.producers.gen.fileNames']), 4)
-        finally:
-            os.unlink(tar)
+        result = self.job.job_aux_inputs(0)
+        self.assertEqual(len(result['physics.producers.gen.fileNames']), self.NREQ)
 
 
 class TestJobAuxInputsSequential(unittest.TestCase):
     """Auxiliary inputs in sequential mode."""
 
-    def _make_job_with_seq_aux(self, aux_files, nreq=2):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = {
-            "code": "",
-            "setup": "/cvmfs/test/setup.sh",
-            "tbs": {
-                "seed": "services.SeedService.baseSeed",
-                "subrunkey": "source.firstSubRun",
-                "event_id": {"source.firstRun": 1430, "source.maxEvents": 1000},
-                "outfiles": {"outputs.Out.fileName": "sim.mu2e.T.TC.sequencer.art"},
-                "auxin": {
-                    "physics.producers.gen.fileNames": [nreq, aux_files]
-                },
-                "sequential_aux": True,
-            },
-            "jobname": "cnf.mu2e.T.TC.0.tar",
-            "owner": "mu2e",
-            "dsconf": "TC",
-        }
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        return Mu2eJobFCL(tar, inloc='dir:/tmp'), tar
+    FILES = ["aux_%02d.art" % i for i in range(6)]
 
-    def test_sequential_first_job(self):
-        files = ["aux_%02d.art" % i for i in range(6)]
-        job, tar = self._make_job_with_seq_aux(files, nreq=2)
-        try:
-            result = job.job_aux_inputs(0)
-            self.assertEqual(result['physics.producers.gen.fileNames'], files[0:2])
-        finally:
-            os.unlink(tar)
+    @classmethod
+    def setUpClass(cls):
+        cls.tar = _make_tarball(_aux_jobpars(cls.FILES, 2, sequential=True),
+                                "module_type : EmptyEvent\n")
+        cls.job = Mu2eJobFCL(cls.tar, inloc='dir:/tmp')
 
-    def test_sequential_second_job(self):
-        files = ["aux_%02d.art" % i for i in range(6)]
-        job, tar = self._make_job_with_seq_aux(files, nreq=2)
-        try:
-            result = job.job_aux_inputs(1)
-            self.assertEqual(result['physics.producers.gen.fileNames'], files[2:4])
-        finally:
-            os.unlink(tar)
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tar)
+
+    def test_sequential_slices(self):
+        for index, expected in ((0, self.FILES[0:2]), (1, self.FILES[2:4]), (2, self.FILES[4:6])):
+            with self.subTest(index=index):
+                result = self.job.job_aux_inputs(index)
+                self.assertEqual(result['physics.producers.gen.fileNames'], expected)
 
     def test_sequential_rollover(self):
         """When index * nreq >= nfiles, roll over from the beginning."""
-        files = ["aux_%02d.art" % i for i in range(4)]
-        job, tar = self._make_job_with_seq_aux(files, nreq=2)
-        try:
-            # Job 2: first=4, which == nf → rollover → first=0
-            result = job.job_aux_inputs(2)
-            self.assertEqual(result['physics.producers.gen.fileNames'], files[0:2])
-        finally:
-            os.unlink(tar)
+        # Job 3: first=6, which == nf → rollover → first=0
+        result = self.job.job_aux_inputs(3)
+        self.assertEqual(result['physics.producers.gen.fileNames'], self.FILES[0:2])
 
 
 # ---------------------------------------------------------------------------
@@ -818,39 +801,21 @@ class TestJobAuxInputsSequential(unittest.TestCase):
 class TestSequencer(unittest.TestCase):
 
     def test_sequencer_from_event_id(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430)
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            seq = job.sequencer(5)
-            self.assertEqual(seq, "001430_00000005")
-        finally:
-            os.unlink(tar)
+        seq = _empty_event_job().sequencer(5)
+        self.assertEqual(seq, "001430_00000005")
 
     def test_sequencer_from_input_files(self):
-        from utils.jobfcl import Mu2eJobFCL
         files = ["sim.mu2e.Test.MDC2025ac.001430_00000000.art",
                  "sim.mu2e.Test.MDC2025ac.001430_00000001.art"]
         jp = _root_input_jobpars(files, merge=2)
-        tar = _make_tarball(jp, "module_type : RootInput\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            seq = job.sequencer(0)
-            # First (sorted) sequencer from input files
-            self.assertEqual(seq, "001430_00000000")
-        finally:
-            os.unlink(tar)
+        job = Mu2eJobFCL(jp['jobname'], inloc='dir:/tmp', json_data=jp)
+        seq = job.sequencer(0)
+        # First (sorted) sequencer from input files
+        self.assertEqual(seq, "001430_00000000")
 
     def test_sequencer_different_indices_differ(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430)
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            self.assertNotEqual(job.sequencer(0), job.sequencer(1))
-        finally:
-            os.unlink(tar)
+        job = _empty_event_job()
+        self.assertNotEqual(job.sequencer(0), job.sequencer(1))
 
 
 # ---------------------------------------------------------------------------
@@ -860,55 +825,27 @@ class TestSequencer(unittest.TestCase):
 class TestJobOutputs(unittest.TestCase):
 
     def test_output_sequencer_substituted(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430)
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            outputs = job.job_outputs(7)
-            out_file = outputs['outputs.PrimaryOutput.fileName']
-            # Sequencer for index 7 with run 1430 = 001430_00000007
-            self.assertIn("001430_00000007", out_file)
-        finally:
-            os.unlink(tar)
+        outputs = _empty_event_job().job_outputs(7)
+        out_file = outputs['outputs.PrimaryOutput.fileName']
+        # Sequencer for index 7 with run 1430 = 001430_00000007
+        self.assertIn("001430_00000007", out_file)
 
     def test_output_owner_substituted(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430, owner='oksuzian')
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            outputs = job.job_outputs(0)
-            out_file = outputs['outputs.PrimaryOutput.fileName']
-            self.assertIn("oksuzian", out_file)
-        finally:
-            os.unlink(tar)
+        outputs = _empty_event_job(owner='oksuzian').job_outputs(0)
+        out_file = outputs['outputs.PrimaryOutput.fileName']
+        self.assertIn("oksuzian", out_file)
 
     def test_output_dsconf_substituted(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430, dsconf='MDC2025ac')
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            outputs = job.job_outputs(0)
-            out_file = outputs['outputs.PrimaryOutput.fileName']
-            self.assertIn("MDC2025ac", out_file)
-        finally:
-            os.unlink(tar)
+        outputs = _empty_event_job(dsconf='MDC2025ac').job_outputs(0)
+        out_file = outputs['outputs.PrimaryOutput.fileName']
+        self.assertIn("MDC2025ac", out_file)
 
     def test_output_follows_mu2e_naming(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430, owner='mu2e', dsconf='TestConf')
-        tar = _make_tarball(jp, "module_type : EmptyEvent\n")
-        try:
-            job = Mu2eJobFCL(tar, inloc='dir:/tmp')
-            outputs = job.job_outputs(3)
-            out_file = outputs['outputs.PrimaryOutput.fileName']
-            parts = out_file.split('.')
-            self.assertEqual(len(parts), 6, f"Expected 6 parts, got: {out_file}")
-            self.assertEqual(parts[0], "sim")
-        finally:
-            os.unlink(tar)
+        outputs = _empty_event_job(owner='mu2e', dsconf='TestConf').job_outputs(3)
+        out_file = outputs['outputs.PrimaryOutput.fileName']
+        parts = out_file.split('.')
+        self.assertEqual(len(parts), 6, f"Expected 6 parts, got: {out_file}")
+        self.assertEqual(parts[0], "sim")
 
 
 # ---------------------------------------------------------------------------
@@ -917,47 +854,50 @@ class TestJobOutputs(unittest.TestCase):
 
 class TestGenerateFCL(unittest.TestCase):
 
-    def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
-        self.files = ["sim.mu2e.Test.MDC2025ac.001430_%08d.art" % i for i in range(4)]
-        jp = _root_input_jobpars(self.files, merge=2)
-        self.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
-        self.Cls = Mu2eJobFCL
+    @classmethod
+    def setUpClass(cls):
+        cls.files = ["sim.mu2e.Test.MDC2025ac.001430_%08d.art" % i for i in range(4)]
+        jp = _jobpars_bytes('root_input', tuple(cls.files), merge=2)
+        cls.tar = _make_tarball(jp, "#include \"base.fcl\"\nmodule_type : RootInput\n")
+        cls.Cls = Mu2eJobFCL
+        # Mu2eJobFCL is read-only once built; shared by the proto='file' tests
+        cls.job = Mu2eJobFCL(cls.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
 
-    def tearDown(self):
-        os.unlink(self.tar)
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tar)
 
     def test_fcl_contains_header_comment(self):
-        job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
+        job = self.job
         fcl = job.generate_fcl(0)
         self.assertIn("Code added by mu2ejobfcl", fcl)
 
     def test_fcl_contains_input_files(self):
-        job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
+        job = self.job
         fcl = job.generate_fcl(0)
         self.assertIn(self.files[0], fcl)
         self.assertIn(self.files[1], fcl)
 
     def test_fcl_does_not_contain_other_job_files(self):
-        job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
+        job = self.job
         fcl = job.generate_fcl(0)
         self.assertNotIn(self.files[2], fcl)
 
     def test_fcl_contains_output_filename(self):
-        job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
+        job = self.job
         fcl = job.generate_fcl(1)
         outputs = job.job_outputs(1)
         for fname in outputs.values():
             self.assertIn(fname, fcl)
 
     def test_fcl_second_job_different_from_first(self):
-        job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
+        job = self.job
         fcl0 = job.generate_fcl(0)
         fcl1 = job.generate_fcl(1)
         self.assertNotEqual(fcl0, fcl1)
 
     def test_fcl_contains_source_file_names_key(self):
-        job = self.Cls(self.tar, inloc='dir:/pnfs/mu2e/tape/phy-sim', proto='file')
+        job = self.job
         fcl = job.generate_fcl(0)
         self.assertIn("source.fileNames", fcl)
 
@@ -967,8 +907,7 @@ class TestGenerateFCL(unittest.TestCase):
         self.assertIn("xroot://fndcadoor.fnal.gov//pnfs/", fcl)
 
     def test_empty_event_fcl_has_subrun(self):
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430)
+        jp = _jobpars_bytes('empty_event', run=1430)
         tar = _make_tarball(jp, "module_type : EmptyEvent\n")
         try:
             job = Mu2eJobFCL(tar, inloc='dir:/tmp')
@@ -1068,6 +1007,56 @@ class TestDatasetFileListFilename(unittest.TestCase):
         # extremely likely for these inputs)
         self.assertNotEqual(fn1.relpathname(), fn2.relpathname())
 
+    def test_get_dataset_files_matches_relpathname(self):
+        from utils import datasetFileList
+        names = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000001.art",
+                 "dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art"]
+        sam = MagicMock()
+        sam.list_files.return_value = names
+        with patch('utils.datasetFileList.get_samweb_wrapper', return_value=sam):
+            paths = datasetFileList.get_dataset_files("dts.mu2e.CeEndpoint.Run1Bab.art", 'disk')
+        root = datasetFileList._dataset_dir("dts.mu2e.CeEndpoint.Run1Bab.art", 'disk')
+        self.assertEqual(paths, [f"{root}/{self.Cls(n).relpathname()}" for n in sorted(names)])
+
+    def test_get_dataset_files_autodetect_prefers_stdloc_order(self):
+        from utils import datasetFileList
+        ds = "dts.mu2e.CeEndpoint.Run1Bab.art"
+        sam = MagicMock()
+        sam.list_files.return_value = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art"]
+        present = {datasetFileList._dataset_dir(ds, 'tape'), datasetFileList._dataset_dir(ds, 'scratch')}
+        with patch('utils.datasetFileList.get_samweb_wrapper', return_value=sam), \
+             patch('utils.datasetFileList.os.path.isdir', side_effect=present.__contains__):
+            paths = datasetFileList.get_dataset_files(ds)
+        self.assertTrue(paths[0].startswith(datasetFileList._dataset_dir(ds, 'tape') + '/'))
+
+    def test_locate_threads_from_env(self):
+        from utils import job_common
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('MU2E_LOCATE_CONCURRENCY', None)
+            self.assertEqual(job_common.locate_threads(), 8)
+            os.environ['MU2E_LOCATE_CONCURRENCY'] = '16'
+            self.assertEqual(job_common.locate_threads(), 16)
+            os.environ['MU2E_LOCATE_CONCURRENCY'] = '500'
+            self.assertEqual(job_common.locate_threads(), job_common.THREADS_MAX)
+
+    def test_get_definition_files_batches_and_falls_back(self):
+        from utils import datasetFileList
+        names = [f"log.mu2e.X.Y.001440_{i:08d}.log" for i in range(5)]
+        loc = lambda f: [{'full_path': 'enstore:/pnfs/mu2e/tape/x'}] if f != names[3] else []
+
+        def locate_files(batch):
+            if len(batch) > 1 and names[0] not in batch:
+                return {}  # wrapper swallowed an error for this batch
+            return {f: loc(f) for f in batch}
+
+        sam = MagicMock()
+        sam.list_definition_files.return_value = list(reversed(names))
+        sam.locate_files.side_effect = locate_files
+        with patch('utils.datasetFileList.get_samweb_wrapper', return_value=sam), \
+             patch('utils.job_common.LOCATE_BATCH', 2):
+            paths = datasetFileList.get_definition_files("log.mu2e.X.Y.log")
+        self.assertEqual(paths, [f"/pnfs/mu2e/tape/x/{n}" for n in names if n != names[3]])
+
 
 # ---------------------------------------------------------------------------
 # 11. Stash path derivation (prerequisite check for future implementation)
@@ -1080,7 +1069,7 @@ class TestStashPathDerivation(unittest.TestCase):
     the implementation can be validated against them.
 
     The formula is:
-        STASH_READ_ROOT/datasets/<tier>/<owner>/<description>/<dsconf>/<ext>/<filename>
+        stash_read_root()/datasets/<tier>/<owner>/<description>/<dsconf>/<ext>/<filename>
     derived purely from the filename via Mu2eFilename.
     """
 
@@ -1142,9 +1131,8 @@ class TestLocateFileStash(unittest.TestCase):
     """_locate_file with inloc='stash' — path derived from filename (SAM only as fallback)."""
 
     def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
         files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00001234.art"]
-        jp = _root_input_jobpars(files)
+        jp = _jobpars_bytes('root_input', tuple(files))
         self.tar = _make_tarball(jp, "module_type : RootInput\n")
         self.Cls = Mu2eJobFCL
         # Simulate files being present on stash CVMFS
@@ -1159,7 +1147,6 @@ class TestLocateFileStash(unittest.TestCase):
         """SAM must not be contacted when inloc='stash'."""
         mock_sam = MagicMock()
         with patch('samweb_client.SAMWebClient', return_value=mock_sam):
-            from utils.jobfcl import Mu2eJobFCL
             job = Mu2eJobFCL(self.tar, inloc='stash', proto='file')
             job._locate_file("dts.mu2e.CeEndpoint.Run1Bab.001440_00001234.art")
         mock_sam.locateFile.assert_not_called()
@@ -1183,25 +1170,19 @@ class TestLocateFileStash(unittest.TestCase):
     def test_stash_path_uses_env_var(self):
         custom_root = "/custom/stash/root"
         with patch.dict(os.environ, {"MU2E_STASH_READ": custom_root}):
-            # Re-import to pick up new env var (module-level constant)
-            import importlib
-            import utils.jobfcl as jfcl_mod
-            importlib.reload(jfcl_mod)
-            job = jfcl_mod.Mu2eJobFCL(self.tar, inloc='stash', proto='file')
+            # Root is looked up per call, so no module reload is needed
+            job = self.Cls(self.tar, inloc='stash', proto='file')
             fname = "dts.mu2e.CeEndpoint.Run1Bab.001440_00001234.art"
             path = job._locate_file(fname)
             self.assertTrue(path.startswith(custom_root))
-            # Restore
-            importlib.reload(jfcl_mod)
 
 
 class TestFormatFilenameStash(unittest.TestCase):
     """_format_filename with inloc='stash' always returns plain path."""
 
     def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
         files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00001234.art"]
-        jp = _root_input_jobpars(files)
+        jp = _jobpars_bytes('root_input', tuple(files))
         self.tar = _make_tarball(jp, "module_type : RootInput\n")
         self.Cls = Mu2eJobFCL
         self.fname = "dts.mu2e.CeEndpoint.Run1Bab.001440_00001234.art"
@@ -1227,10 +1208,9 @@ class TestFormatFilenameStash(unittest.TestCase):
         self.assertTrue(result.startswith(STASH_READ_DEFAULT))
 
     def test_stash_fcl_contains_cvmfs_path(self):
-        from utils.jobfcl import Mu2eJobFCL
         files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art",
                  "dts.mu2e.CeEndpoint.Run1Bab.001440_00000001.art"]
-        jp = _root_input_jobpars(files, merge=2)
+        jp = _jobpars_bytes('root_input', tuple(files), merge=2)
         tar = _make_tarball(jp, "module_type : RootInput\n")
         try:
             job = Mu2eJobFCL(tar, inloc='stash', proto='root')
@@ -1305,7 +1285,7 @@ class TestStashUtils(unittest.TestCase):
         self.assertTrue(path.endswith(fname))
 
     def test_copy_dataset_dry_run(self):
-        """dry_run=True must not invoke cp or makedirs."""
+        """dry_run=True must not copy or makedirs."""
         from utils import stash_utils
 
         mock_files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art",
@@ -1316,9 +1296,10 @@ class TestStashUtils(unittest.TestCase):
         ]
 
         with patch('utils.stash_utils.list_files', return_value=mock_files), \
-             patch('utils.stash_utils.locate_file_full', return_value=mock_locations), \
+             patch('utils.stash_utils.locate_files',
+                   side_effect=lambda fns: {f: mock_locations for f in fns}), \
              patch('os.makedirs') as mock_mkdir, \
-             patch('subprocess.run') as mock_run:
+             patch('utils.stash_utils.shutil.copyfile') as mock_copy:
             n = stash_utils.copy_dataset_to_stash(
                 "dts.mu2e.CeEndpoint.Run1Bab.art",
                 source_loc='disk',
@@ -1327,11 +1308,11 @@ class TestStashUtils(unittest.TestCase):
             )
 
         mock_mkdir.assert_not_called()
-        mock_run.assert_not_called()
+        mock_copy.assert_not_called()
         self.assertEqual(n, 2)
 
-    def test_copy_dataset_calls_cp(self):
-        """copy_dataset_to_stash must call subprocess.run with cp."""
+    def test_copy_dataset_copies_to_write_path(self):
+        """copy_dataset_to_stash copies each source to its stash write path."""
         from utils import stash_utils
 
         mock_files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art"]
@@ -1339,13 +1320,12 @@ class TestStashUtils(unittest.TestCase):
             {'location_type': 'disk',
              'full_path': '/pnfs/mu2e/persistent/datasets/phy-sim/dts/mu2e/CeEndpoint/Run1Bab/art'}
         ]
-        mock_run_result = MagicMock()
-        mock_run_result.returncode = 0
 
         with patch('utils.stash_utils.list_files', return_value=mock_files), \
-             patch('utils.stash_utils.locate_file_full', return_value=mock_locations), \
+             patch('utils.stash_utils.locate_files',
+                   side_effect=lambda fns: {f: mock_locations for f in fns}), \
              patch('os.makedirs'), \
-             patch('subprocess.run', return_value=mock_run_result) as mock_run:
+             patch('utils.stash_utils.shutil.copyfile') as mock_copy:
             n = stash_utils.copy_dataset_to_stash(
                 "dts.mu2e.CeEndpoint.Run1Bab.art",
                 source_loc='disk',
@@ -1354,8 +1334,9 @@ class TestStashUtils(unittest.TestCase):
             )
 
         self.assertEqual(n, 1)
-        call_args = mock_run.call_args[0][0]
-        self.assertEqual(call_args[0], 'cp')
+        src, dest = mock_copy.call_args[0]
+        self.assertEqual(src, '/pnfs/mu2e/persistent/datasets/phy-sim/dts/mu2e/CeEndpoint/Run1Bab/art/' + mock_files[0])
+        self.assertEqual(dest, stash_utils.write_path_for_file(mock_files[0]))
 
     def test_copy_dataset_limit(self):
         """--limit N should copy at most N files."""
@@ -1366,13 +1347,12 @@ class TestStashUtils(unittest.TestCase):
             {'location_type': 'disk',
              'full_path': '/pnfs/mu2e/persistent/datasets/phy-sim/dts/mu2e/CeEndpoint/Run1Bab/art'}
         ]
-        mock_run_result = MagicMock()
-        mock_run_result.returncode = 0
 
         with patch('utils.stash_utils.list_files', return_value=mock_files), \
-             patch('utils.stash_utils.locate_file_full', return_value=mock_locations), \
+             patch('utils.stash_utils.locate_files',
+                   side_effect=lambda fns: {f: mock_locations for f in fns}), \
              patch('os.makedirs'), \
-             patch('subprocess.run', return_value=mock_run_result) as mock_run:
+             patch('utils.stash_utils.shutil.copyfile') as mock_copy:
             stash_utils.copy_dataset_to_stash(
                 "dts.mu2e.CeEndpoint.Run1Bab.art",
                 source_loc='disk',
@@ -1381,7 +1361,71 @@ class TestStashUtils(unittest.TestCase):
                 verbose=False,
             )
 
-        self.assertEqual(mock_run.call_count, 3)
+        self.assertEqual(mock_copy.call_count, 3)
+
+    def test_copy_dataset_counts_copy_failure(self):
+        """An OSError from the copy is reported and not counted as copied."""
+        from utils import stash_utils
+
+        mock_files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art"]
+        mock_locations = [
+            {'location_type': 'disk',
+             'full_path': '/pnfs/mu2e/persistent/datasets/phy-sim/dts/mu2e/CeEndpoint/Run1Bab/art'}
+        ]
+
+        with patch('utils.stash_utils.list_files', return_value=mock_files), \
+             patch('utils.stash_utils.locate_files',
+                   side_effect=lambda fns: {f: mock_locations for f in fns}), \
+             patch('os.makedirs'), \
+             patch('utils.stash_utils.shutil.copyfile', side_effect=OSError("no space")), \
+             patch('sys.stderr', new_callable=io.StringIO) as err:
+            n = stash_utils.copy_dataset_to_stash(
+                "dts.mu2e.CeEndpoint.Run1Bab.art",
+                source_loc='disk',
+                dry_run=False,
+                verbose=False,
+            )
+
+        self.assertEqual(n, 0)
+        self.assertIn("FAIL", err.getvalue())
+
+    def test_copy_threads_from_env(self):
+        """MU2E_STASH_COPY_THREADS sets the copy pool size (default 8)."""
+        from utils.job_common import env_threads, THREADS_MAX
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('MU2E_STASH_COPY_THREADS', None)
+            self.assertEqual(env_threads('MU2E_STASH_COPY_THREADS'), 8)
+            os.environ['MU2E_STASH_COPY_THREADS'] = '3'
+            self.assertEqual(env_threads('MU2E_STASH_COPY_THREADS'), 3)
+            os.environ['MU2E_STASH_COPY_THREADS'] = '500'
+            self.assertEqual(env_threads('MU2E_STASH_COPY_THREADS'), THREADS_MAX)
+
+    def test_copy_dataset_locates_in_batches(self):
+        """Sources are located in batched requests, not one per file."""
+        from utils import stash_utils
+
+        mock_files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_%08d.art" % i for i in range(5)]
+        mock_locations = [
+            {'location_type': 'disk',
+             'full_path': '/pnfs/mu2e/persistent/datasets/phy-sim/dts/mu2e/CeEndpoint/Run1Bab/art'}
+        ]
+
+        with patch('utils.stash_utils.list_files', return_value=mock_files), \
+             patch('utils.stash_utils.locate_files',
+                   side_effect=lambda fns: {f: mock_locations for f in fns}) as mock_locate, \
+             patch('utils.job_common.LOCATE_BATCH', 2), \
+             patch('os.makedirs'), \
+             patch('utils.stash_utils.shutil.copyfile') as mock_copy:
+            n = stash_utils.copy_dataset_to_stash(
+                "dts.mu2e.CeEndpoint.Run1Bab.art",
+                source_loc='disk',
+                dry_run=False,
+                verbose=False,
+            )
+
+        self.assertEqual(n, 5)
+        self.assertEqual(mock_locate.call_count, 3)
+        self.assertEqual(mock_copy.call_count, 5)
 
     def test_copy_dataset_skips_on_locate_failure(self):
         """Files that cannot be located should be skipped, not crash."""
@@ -1390,9 +1434,9 @@ class TestStashUtils(unittest.TestCase):
         mock_files = ["dts.mu2e.CeEndpoint.Run1Bab.001440_00000000.art"]
 
         with patch('utils.stash_utils.list_files', return_value=mock_files), \
-             patch('utils.stash_utils.locate_file_full', return_value=[]), \
+             patch('utils.stash_utils.locate_files', return_value={}), \
              patch('os.makedirs'), \
-             patch('subprocess.run') as mock_run:
+             patch('utils.stash_utils.shutil.copyfile') as mock_copy:
             n = stash_utils.copy_dataset_to_stash(
                 "dts.mu2e.CeEndpoint.Run1Bab.art",
                 source_loc='disk',
@@ -1400,7 +1444,7 @@ class TestStashUtils(unittest.TestCase):
                 verbose=False,
             )
 
-        mock_run.assert_not_called()
+        mock_copy.assert_not_called()
         self.assertEqual(n, 0)
 
 
@@ -1418,7 +1462,7 @@ class TestProcessJobdefStashSkipsCopyInput(unittest.TestCase):
         from utils import prod_utils
 
         files = ["sim.mu2e.Test.TestConf.001440_00000000.art"]
-        jp = _root_input_jobpars(files, merge=1)
+        jp = _jobpars_bytes('root_input', tuple(files), merge=1)
         tar = _make_tarball(jp, "module_type : RootInput\n")
 
         args = MagicMock()
@@ -1459,6 +1503,50 @@ class TestProcessJobdefStashSkipsCopyInput(unittest.TestCase):
         os.unlink(tar)
 
 
+class TestProcessJobdefCopyInput(unittest.TestCase):
+    """copy_input fetches inputs with one mdh call per location and moves
+    each file into indir/ once, even when several inputs list it."""
+
+    def setUp(self):
+        import tempfile
+        self._orig_dir = os.getcwd()
+        self._tmpdir = tempfile.mkdtemp()
+        os.chdir(self._tmpdir)
+
+    def tearDown(self):
+        os.chdir(self._orig_dir)
+        import shutil
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def test_batched_fetch_and_move(self):
+        from utils import prod_utils
+        a, b = "sim.mu2e.T.C.001440_00000000.art", "sim.mu2e.T.C.001440_00000001.art"
+        location = {a: 'disk', b: 'tape'}
+
+        def mdh(cmd, **kw):
+            for f in cmd[cmd.index('local') + 1:]:
+                Path(f).write_text('x')
+
+        args = MagicMock()
+        args.copy_input = True
+        jobdesc = [{'tarball': 'cnf.mu2e.T.C.0.tar', 'njobs': 1, 'inloc': 'disk', 'outputs': []}]
+        with patch('utils.prod_utils._fetch_file_local'), \
+             patch('utils.prod_utils._tarball_json', return_value={}), \
+             patch('utils.prod_utils._get_job_io') as mock_io, \
+             patch('utils.prod_utils.write_fcl', return_value='x.fcl'), \
+             patch('utils.prod_utils._extract_simjob_setup', return_value='setup.sh'), \
+             patch('utils.prod_utils.locate_file_full',
+                   side_effect=lambda f: [{'location_type': location[f]}]), \
+             patch('utils.prod_utils.run', side_effect=mdh) as mock_run:
+            mock_io.return_value.job_inputs.return_value = {'primary': [a, b], 'aux': [a]}
+            prod_utils.process_jobdef(jobdesc, "cnf.mu2e.T.C.0.fcl", args)
+
+        fetched = sorted((c.args[0][c.args[0].index('-s') + 1], c.args[0][-1])
+                         for c in mock_run.call_args_list)
+        self.assertEqual(fetched, [('disk', a), ('tape', b)])
+        self.assertEqual(sorted(os.listdir('indir')), [a, b])
+
+
 # ---------------------------------------------------------------------------
 # 15. version field in tarball names
 # ---------------------------------------------------------------------------
@@ -1559,9 +1647,8 @@ class TestStashFallback(unittest.TestCase):
     _FNAME = 'dts.mu2e.CeEndpoint.Run1Bab.001440_00001234.art'
 
     def setUp(self):
-        from utils.jobfcl import Mu2eJobFCL
         files = [self._FNAME]
-        jp = _root_input_jobpars(files)
+        jp = _jobpars_bytes('root_input', tuple(files))
         self.tar = _make_tarball(jp, "module_type : RootInput\n")
         self.Cls = Mu2eJobFCL
         # Simulate file NOT present on stash CVMFS
@@ -1583,7 +1670,6 @@ class TestStashFallback(unittest.TestCase):
         """SAM is contacted as fallback when the stash CVMFS path does not exist."""
         mock_sam = self._mock_sam()
         with patch('samweb_client.SAMWebClient', return_value=mock_sam):
-            from utils.jobfcl import Mu2eJobFCL
             job = Mu2eJobFCL(self.tar, inloc='stash', proto='file')
             job._locate_file(self._FNAME)
         mock_sam.locateFile.assert_called_once_with(self._FNAME)
@@ -1592,7 +1678,6 @@ class TestStashFallback(unittest.TestCase):
         """The SAM-provided path is returned when the stash file is absent."""
         mock_sam = self._mock_sam()
         with patch('samweb_client.SAMWebClient', return_value=mock_sam):
-            from utils.jobfcl import Mu2eJobFCL
             job = Mu2eJobFCL(self.tar, inloc='stash', proto='file')
             path = job._locate_file(self._FNAME)
         self.assertEqual(path, self._TAPE_DIR)
@@ -1602,7 +1687,6 @@ class TestStashFallback(unittest.TestCase):
         mock_sam = MagicMock()
         mock_sam.locateFile.return_value = []
         with patch('samweb_client.SAMWebClient', return_value=mock_sam):
-            from utils.jobfcl import Mu2eJobFCL
             job = Mu2eJobFCL(self.tar, inloc='stash', proto='file')
             with self.assertRaises(ValueError):
                 job._locate_file(self._FNAME)
@@ -1611,7 +1695,6 @@ class TestStashFallback(unittest.TestCase):
         """_format_filename with proto='root' converts the SAM tape path to an xroot URL."""
         mock_sam = self._mock_sam()
         with patch('samweb_client.SAMWebClient', return_value=mock_sam):
-            from utils.jobfcl import Mu2eJobFCL
             job = Mu2eJobFCL(self.tar, inloc='stash', proto='root')
             result = job._format_filename(self._FNAME)
         self.assertTrue(result.startswith("xroot://"),
@@ -1950,7 +2033,6 @@ class TestJobOutputsOverride(unittest.TestCase):
 
     def test_override_seq_used_instead_of_computed(self):
         """override_seq must appear in the output filename."""
-        from utils.jobfcl import Mu2eJobFCL
         jp = _generic_reco_jobpars()
         tar = _make_tarball(jp, "#include \"OnSpill.fcl\"\n")
         try:
@@ -1963,7 +2045,6 @@ class TestJobOutputsOverride(unittest.TestCase):
 
     def test_override_desc_replaces_desc_placeholder(self):
         """{desc} in outfile template is replaced by override_desc."""
-        from utils.jobfcl import Mu2eJobFCL
         jp = _generic_reco_jobpars()
         tar = _make_tarball(jp, "#include \"OnSpill.fcl\"\n")
         try:
@@ -1980,7 +2061,6 @@ class TestJobOutputsOverride(unittest.TestCase):
             os.unlink(tar)
 
     def test_different_override_desc_yields_different_output(self):
-        from utils.jobfcl import Mu2eJobFCL
         jp = _generic_reco_jobpars()
         tar = _make_tarball(jp, "#include \"OnSpill.fcl\"\n")
         try:
@@ -1995,7 +2075,6 @@ class TestJobOutputsOverride(unittest.TestCase):
             os.unlink(tar)
 
     def test_output_follows_six_part_mu2e_convention(self):
-        from utils.jobfcl import Mu2eJobFCL
         jp = _generic_reco_jobpars()
         tar = _make_tarball(jp, "#include \"OnSpill.fcl\"\n")
         try:
@@ -2018,8 +2097,7 @@ class TestJobOutputsOverride(unittest.TestCase):
 
     def test_no_overrides_backward_compatible(self):
         """Existing callers with no overrides must still work."""
-        from utils.jobfcl import Mu2eJobFCL
-        jp = _empty_event_jobpars(run=1430)
+        jp = _jobpars_bytes('empty_event', run=1430)
         tar = _make_tarball(jp, "module_type : EmptyEvent\n")
         try:
             job = Mu2eJobFCL(tar, inloc='dir:/tmp')
@@ -2052,8 +2130,16 @@ class TestGenericTarballGuard(unittest.TestCase):
         """build_jobdef must NOT call validate_output_filenames when
         generic_tarball is set -- the deferred {desc}/sequencer cannot resolve
         at build time, so running the guard would abort the build."""
+        import tempfile
         from unittest.mock import patch
         from utils import json2jobdef
+        # build_jobdef writes template.fcl into cwd; keep it out of the
+        # checkout (and away from other test processes under xdist)
+        orig_dir = os.getcwd()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        os.chdir(tmpdir.name)
+        self.addCleanup(os.chdir, orig_dir)
         with patch.object(json2jobdef, 'validate_output_filenames') as guard, \
              patch.object(json2jobdef, 'create_jobdef'), \
              patch.object(json2jobdef, 'get_parfile_name', return_value='cnf.x.0.tar'), \
@@ -2325,7 +2411,6 @@ class TestSequencerRunNumber(unittest.TestCase):
     """
 
     def test_runNumber_produces_mu2e_standard_sequencer(self):
-        from utils.jobfcl import Mu2eJobFCL
         jp = _pbi_sequence_jobpars(run=1430)
         tar = _make_tarball(jp, "module_type : PBISequence\n")
         try:
@@ -2339,7 +2424,6 @@ class TestSequencerRunNumber(unittest.TestCase):
     def test_runNumber_bypasses_filename_parsing(self):
         # Input filename that would fail Mu2eFilename parsing — verifies
         # the short-circuit fires before the fallback path.
-        from utils.jobfcl import Mu2eJobFCL
         jp = _pbi_sequence_jobpars(run=1430, files=["not-a-mu2e-name.txt"])
         tar = _make_tarball(jp, "module_type : PBISequence\n")
         try:
@@ -2353,7 +2437,6 @@ class TestSequencerRunNumber(unittest.TestCase):
     def test_firstRun_and_runNumber_agree(self):
         # Different event_id keys should produce the same sequencer for
         # the same run+index.
-        from utils.jobfcl import Mu2eJobFCL
         jp_first = _empty_event_jobpars(run=1430)
         jp_num = _pbi_sequence_jobpars(run=1430)
         tar_first = _make_tarball(jp_first, "module_type : EmptyEvent\n")
@@ -2388,7 +2471,6 @@ class TestEventIdPerIndex(unittest.TestCase):
         return jp
 
     def test_linear_override_applied_per_index(self):
-        from utils.jobfcl import Mu2eJobFCL
         jp = self._jobpars_with_per_index({
             "source.firstEventNumber": {"offset": 0, "step": 1000},
         })
@@ -2402,7 +2484,6 @@ class TestEventIdPerIndex(unittest.TestCase):
             os.unlink(tar)
 
     def test_nonzero_offset(self):
-        from utils.jobfcl import Mu2eJobFCL
         jp = self._jobpars_with_per_index({
             "source.firstEventNumber": {"offset": 42, "step": 10},
         })
@@ -2415,7 +2496,6 @@ class TestEventIdPerIndex(unittest.TestCase):
 
     def test_missing_step_defaults_to_zero(self):
         # A spec with only offset should treat step as 0 (i.e. constant).
-        from utils.jobfcl import Mu2eJobFCL
         jp = self._jobpars_with_per_index({
             "source.firstEventNumber": {"offset": 100},
         })
@@ -2430,7 +2510,6 @@ class TestEventIdPerIndex(unittest.TestCase):
     def test_overrides_base_event_id_on_same_key(self):
         # If event_id fixes a value and event_id_per_index names the same
         # key, the per-index computation wins.
-        from utils.jobfcl import Mu2eJobFCL
         jp = self._jobpars_with_per_index(
             per_index={"source.firstEventNumber": {"offset": 0, "step": 500}},
             event_id={"source.runNumber": 1430, "source.firstEventNumber": 999},
@@ -2514,6 +2593,17 @@ class TestConfigureChunkMode(unittest.TestCase):
         _configure_chunk_mode(cfg)
         self.assertEqual(cfg['fcl_overrides']['source.fileNames'], ['user_chunk.txt'])
 
+    def test_does_not_mutate_shared_fcl_overrides(self):
+        # expand_configs jobs may share one fcl_overrides dict.
+        from utils.json2jobdef import _configure_chunk_mode
+        src = self._make_source(nlines=100)
+        shared = {'a.b': 1}
+        cfg = self._base_config(src, chunk_lines=50)
+        cfg['fcl_overrides'] = shared
+        _configure_chunk_mode(cfg)
+        self.assertEqual(shared, {'a.b': 1})
+        self.assertEqual(cfg['fcl_overrides'], {'a.b': 1, 'source.fileNames': ['chunk.txt']})
+
     def test_rejects_zero_chunk_lines(self):
         from utils.json2jobdef import _configure_chunk_mode
         src = self._make_source(nlines=100)
@@ -3128,6 +3218,537 @@ class TestUniformityReport(unittest.TestCase):
         self.assertNotIn('NoGen', out)  # missing-gencount goes to stderr, not the table
 
 
+# ---------------------------------------------------------------------------
+# 36. njobs prefix sums (prod_utils.py)
+# ---------------------------------------------------------------------------
+
+class TestJobdescOffsets(unittest.TestCase):
+    """process_jobdef finds a job's entry by bisecting the njobs prefix sums."""
+
+    def setUp(self):
+        self.jobdesc = [
+            {'tarball': 'cnf.mu2e.A.C.0.tar', 'njobs': 3, 'inloc': 'disk', 'outputs': []},
+            {'tarball': 'cnf.mu2e.G.C.0.tar', 'inloc': 'disk', 'outputs': []},
+            {'tarball': 'cnf.mu2e.B.C.0.tar', 'njobs': 2, 'inloc': 'disk', 'outputs': []},
+        ]
+
+    def test_offsets_skip_generic_entries(self):
+        from utils.prod_utils import _jobdesc_offsets
+        ends, positions = _jobdesc_offsets(self.jobdesc)
+        self.assertEqual(list(ends), [3, 5])
+        self.assertEqual(positions, [0, 2])
+
+    def test_process_jobdef_range_boundaries(self):
+        """Index == end of an entry belongs to the next entry, index ==
+        total is out of range."""
+        from utils import prod_utils
+        args = MagicMock()
+        args.copy_input = False
+        with patch('utils.prod_utils._fetch_file_local'), \
+             patch('utils.prod_utils._tarball_json', return_value={}), \
+             patch('utils.prod_utils._get_job_io') as mock_io, \
+             patch('utils.prod_utils.write_fcl', return_value='x.fcl') as mock_wfcl, \
+             patch('utils.prod_utils._extract_simjob_setup', return_value='setup.sh'):
+            mock_io.return_value.job_inputs.return_value = {}
+            for idx, tarball, local in ((2, 'cnf.mu2e.A.C.0.tar', 2),
+                                        (3, 'cnf.mu2e.B.C.0.tar', 0)):
+                prod_utils.process_jobdef(self.jobdesc, f"cnf.mu2e.X.C.{idx}.fcl", args)
+                self.assertEqual(mock_wfcl.call_args[0][0], tarball)
+                self.assertEqual(mock_wfcl.call_args[0][3], local)
+            with self.assertRaises(SystemExit):
+                prod_utils.process_jobdef(self.jobdesc, "cnf.mu2e.X.C.5.fcl", args)
+
+
+# ---------------------------------------------------------------------------
+# 37. push_data output matching (prod_utils.py)
+# ---------------------------------------------------------------------------
+
+class TestPushData(unittest.TestCase):
+    """push_data matches every outputs[] pattern against one listing of cwd
+    and emits a single output.txt for one pushOutput call."""
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        for name in ("dts.mu2e.A.C.001430_00000001.art",
+                     "dts.mu2e.A.C.001430_00000000.art",
+                     "nts.mu2e.A.C.001430_00000000.root",
+                     "log.mu2e.A.C.001430_00000000.log"):
+            Path(name).write_text("x")
+
+    def tearDown(self):
+        import shutil
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_patterns_share_listing(self):
+        from utils import prod_utils
+        outputs = [
+            {'dataset': 'dts.mu2e.A.C.*.art', 'location': 'tape'},
+            {'dataset': 'nts.mu2e.A.C.*.root', 'location': 'disk'},
+            {'dataset': 'mcs.mu2e.A.C.*.art', 'location': 'tape'},
+        ]
+        with patch('utils.prod_utils.run', return_value=0) as mock_run:
+            prod_utils.push_data(outputs, "a.art b.art")
+        mock_run.assert_called_once()
+        self.assertEqual(Path("output.txt").read_text().splitlines(), [
+            "tape dts.mu2e.A.C.001430_00000000.art parents_list.txt",
+            "tape dts.mu2e.A.C.001430_00000001.art parents_list.txt",
+            "disk nts.mu2e.A.C.001430_00000000.root parents_list.txt",
+        ])
+        self.assertEqual(Path("parents_list.txt").read_text(), "a.art\nb.art\n")
+
+    def test_untracked_parents(self):
+        from utils import prod_utils
+        outputs = [{'dataset': 'nts.mu2e.A.C.001430_00000000.root', 'location': 'disk'}]
+        with patch('utils.prod_utils.run', return_value=0):
+            prod_utils.push_data(outputs, "", track_parents=False)
+        self.assertEqual(Path("output.txt").read_text(),
+                         "disk nts.mu2e.A.C.001430_00000000.root none\n")
+        self.assertFalse(Path("parents_list.txt").exists())
+
+    def test_match_local_glob_semantics(self):
+        from utils.prod_utils import _match_local
+        names = [".hidden.art", "a.art", "b.root"]
+        self.assertEqual(_match_local("*.art", names), ["a.art"])
+        self.assertEqual(_match_local(".*.art", names), [".hidden.art"])
+        self.assertEqual(_match_local("?.root", names), ["b.root"])
+
+
+# ---------------------------------------------------------------------------
+# 38. shared per-tarball jobpars.json (prod_utils.py)
+# ---------------------------------------------------------------------------
+
+class TestTarballJsonCache(unittest.TestCase):
+    """_get_job_pars / _get_job_io share one parse of jobpars.json per
+    tarball version."""
+
+    def setUp(self):
+        files = ["sim.mu2e.Test.TestConf.001440_00000000.art"]
+        self.tar = _make_tarball(_root_input_jobpars(files))
+
+    def tearDown(self):
+        os.unlink(self.tar)
+
+    def test_pars_and_io_share_parse(self):
+        from utils import prod_utils
+        with patch.object(prod_utils.Mu2eJobBase, '_extract_json',
+                          autospec=True, side_effect=lambda self: {'setup': 's.sh'}) as mock_extract:
+            jp = prod_utils._get_job_pars(self.tar)
+            jio = prod_utils._get_job_io(self.tar)
+        self.assertEqual(mock_extract.call_count, 1)
+        self.assertIs(jp.json_data, jio.json_data)
+        self.assertEqual(jp.setup(), 's.sh')
+
+    def test_rewritten_tarball_reparsed(self):
+        from utils import prod_utils
+        before = prod_utils._tarball_json(self.tar)
+        new_tar = _make_tarball({"setup": "/other/setup.sh", "tbs": {}})
+        os.replace(new_tar, self.tar)
+        after = prod_utils._tarball_json(self.tar)
+        self.assertNotEqual(before['setup'], after['setup'])
+        self.assertEqual(after['setup'], "/other/setup.sh")
+
+
+# ---------------------------------------------------------------------------
+# 39. write_fcl_template (prod_utils.py)
+# ---------------------------------------------------------------------------
+
+class TestWriteFclTemplate(unittest.TestCase):
+    """template.fcl = base #include, extra #includes, then JSON-formatted overrides."""
+
+    def test_includes_and_overrides(self):
+        import tempfile
+        from utils.prod_utils import write_fcl_template
+        orig_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                write_fcl_template("Production/JobConfig/base.fcl", {
+                    '#include': ["a.fcl", "b.fcl"],
+                    'services.SeedService.baseSeed': 8,
+                    'outputs.Out.fileName': "dts.owner.desc.version.sequencer.art",
+                })
+                content = Path('template.fcl').read_text()
+            finally:
+                os.chdir(orig_dir)
+        self.assertEqual(content,
+                         '#include "Production/JobConfig/base.fcl"\n'
+                         '#include "a.fcl"\n'
+                         '#include "b.fcl"\n'
+                         'services.SeedService.baseSeed: 8\n'
+                         'outputs.Out.fileName: "dts.owner.desc.version.sequencer.art"\n')
+
+    def test_identical_template_not_rewritten(self):
+        import tempfile
+        from utils.prod_utils import write_fcl_template
+        orig_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                write_fcl_template("base.fcl", {'a.b': 1})
+                with patch.object(Path, 'write_text') as mock_write:
+                    write_fcl_template("base.fcl", {'a.b': 1})
+                mock_write.assert_not_called()
+                # Appended (resampler) or different content is rewritten
+                with open('template.fcl', 'a') as f:
+                    f.write("physics.filters.r.mu2e.MaxEventsToSkip: 5\n")
+                write_fcl_template("base.fcl", {'a.b': 1})
+                content = Path('template.fcl').read_text()
+            finally:
+                os.chdir(orig_dir)
+        self.assertEqual(content, '#include "base.fcl"\na.b: 1\n')
+
+
+# ---------------------------------------------------------------------------
+# 40. _job_index_from_fname (prod_utils.py)
+# ---------------------------------------------------------------------------
+
+class TestJobIndexFromFname(unittest.TestCase):
+    """Sequencer field -> (job_index, sequencer); zero-padded and all-zero cases."""
+
+    def test_padded_sequencer(self):
+        from utils.prod_utils import _job_index_from_fname
+        self.assertEqual(_job_index_from_fname("etc.mu2e.index.000.0000042.txt"),
+                         (42, "0000042"))
+
+    def test_all_zero_sequencer_with_dir(self):
+        from utils.prod_utils import _job_index_from_fname
+        self.assertEqual(_job_index_from_fname("/data/x.x.x.x.00000000.x"),
+                         (0, "00000000"))
+
+    def test_wrong_field_count_raises(self):
+        from utils.prod_utils import _job_index_from_fname
+        for bad in ("a.b.c.d.e", "a.b.c.d.e.f.g"):
+            with self.assertRaises(RuntimeError):
+                _job_index_from_fname(bad)
+
+
+# ---------------------------------------------------------------------------
+# 41. derive_desc / prepare_fields_for_job (config_utils.py)
+# ---------------------------------------------------------------------------
+
+class TestDeriveDesc(unittest.TestCase):
+    """desc from input_data (+pbeam for mixing); no copy on the lookup path."""
+
+    CONFIG = {'input_data': {'dts.mu2e.CosmicSignal.MDC2025ac.art': 1},
+              'pbeam': 'Mix1BB', 'fcl_overrides': {'a': 1}}
+
+    def test_standard_and_mixing(self):
+        from utils.config_utils import derive_desc
+        self.assertEqual(derive_desc(self.CONFIG), 'CosmicSignal')
+        self.assertEqual(derive_desc(self.CONFIG, 'mixing'), 'CosmicSignalMix1BB')
+
+    def test_invalid_dataset_raises(self):
+        from utils.config_utils import derive_desc
+        with self.assertRaises(ValueError):
+            derive_desc({'input_data': 'not.a.dataset'})
+
+    def test_prepare_fields_is_shallow_copy(self):
+        from utils.config_utils import prepare_fields_for_job
+        out = prepare_fields_for_job(self.CONFIG)
+        self.assertEqual(out['desc'], 'CosmicSignal')
+        self.assertNotIn('desc', self.CONFIG)
+        self.assertIsNot(out, self.CONFIG)
+        self.assertIs(out['input_data'], self.CONFIG['input_data'])
+
+
+# ---------------------------------------------------------------------------
+# 42. db_analyzer location prefetch
+# ---------------------------------------------------------------------------
+
+class TestPrefetchLocations(unittest.TestCase):
+    """Only outputs with no recorded location are inferred, once each, and
+    successful inferences are reused from the location_cache table."""
+
+    def setUp(self):
+        from utils import db_analyzer
+        self.da = db_analyzer
+        patcher = patch.dict(db_analyzer._location_cache, {}, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_infers_only_unknown_locations(self):
+        out = lambda ds, loc=None: types.SimpleNamespace(dataset=ds, location=loc)
+        jobs = [types.SimpleNamespace(outputs=[out('a'), out('b', 'enstore'), out('c')]),
+                types.SimpleNamespace(outputs=[out('a'), out(None)])]
+        info_map = {'c': types.SimpleNamespace(location='dcache')}
+        from utils.poms_db import get_db_session
+        with patch.object(self.da, '_infer_location', side_effect=lambda d: 'N/A') as infer:
+            self.da._prefetch_locations(get_db_session(None), jobs, info_map)
+        infer.assert_called_once_with('a')
+
+    def test_persists_locations_across_runs(self):
+        from datetime import datetime, timedelta
+        from utils.poms_db import get_db_session, LocationCache
+        session = get_db_session(None)
+        session.add(LocationCache(dataset='stale', location='dcache',
+                                  updated_at=datetime.now() - timedelta(days=2)))
+        session.commit()
+        jobs = [types.SimpleNamespace(outputs=[types.SimpleNamespace(dataset=d, location=None)
+                                               for d in ('a', 'b', 'stale')])]
+
+        def infer(d):
+            self.da._location_cache[d] = {'a': 'enstore', 'stale': 'dcache'}.get(d, 'N/A')
+            return self.da._location_cache[d]
+
+        with patch.object(self.da, '_infer_location', side_effect=infer) as first:
+            self.da._prefetch_locations(session, jobs, {})
+        self.assertEqual(sorted(c.args[0] for c in first.call_args_list), ['a', 'b', 'stale'])
+
+        # A new run (empty in-process cache) re-asks SAM only for 'b',
+        # whose lookup found nothing and so was not stored
+        self.da._location_cache.clear()
+        with patch.object(self.da, '_infer_location', side_effect=infer) as second:
+            self.da._prefetch_locations(session, jobs, {})
+        second.assert_called_once_with('b')
+        self.assertEqual(self.da._location_cache['a'], 'enstore')
+
+    def test_lookups_use_locate_concurrency(self):
+        """SAM lookups share MU2E_LOCATE_CONCURRENCY with datasetFileList."""
+        from utils.poms_db import get_db_session
+        jobs = [types.SimpleNamespace(outputs=[types.SimpleNamespace(dataset=d, location=None)
+                                               for d in 'abcd'])]
+        with patch.dict(os.environ, {'MU2E_LOCATE_CONCURRENCY': '3'}), \
+             patch.object(self.da, 'ThreadPoolExecutor', wraps=self.da.ThreadPoolExecutor) as pool, \
+             patch.object(self.da, '_infer_location', side_effect=lambda d: 'N/A'):
+            self.da._prefetch_locations(get_db_session(None), jobs, {})
+        self.assertEqual(pool.call_args.kwargs['max_workers'], 3)
+
+    def test_read_only_db_without_cache_table(self):
+        """A read-only database built before location_cache still lists jobs."""
+        import shutil
+        import tempfile
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from utils.poms_db import Base, Job, JobOutput, LocationCache, get_db_session
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'poms_data.db')
+        engine = create_engine(f'sqlite:///{path}')
+        Base.metadata.create_all(
+            engine, tables=[t for t in Base.metadata.sorted_tables if t is not LocationCache.__table__])
+        seed = sessionmaker(bind=engine)()
+        job = Job(tarball='cnf.mu2e.A.MDC2025ac.0.tar', njobs=1)
+        job.outputs = [JobOutput(dataset='dts.mu2e.A.MDC2025ac.art')]
+        seed.add(job)
+        seed.commit()
+        seed.close()
+        engine.dispose()
+
+        session = get_db_session(f'file:{path}?mode=ro&uri=true')
+        with patch.object(self.da, '_infer_location', side_effect=lambda d: 'disk'), \
+             patch('sys.stdout', new_callable=io.StringIO) as out:
+            self.da.list_jobs(session, show_outputs=True)
+        self.assertIn('cnf.mu2e.A.MDC2025ac.0.tar', out.getvalue())
+
+
+# ---------------------------------------------------------------------------
+# 43. db_analyzer job/dataset queries
+# ---------------------------------------------------------------------------
+
+class TestCollectJobs(unittest.TestCase):
+    """SQL-side filters must select the same jobs as the fnmatch/substring rules."""
+
+    @classmethod
+    def setUpClass(cls):
+        from utils.poms_db import get_db_session, Job
+        cls.session = get_db_session(None)
+        for tarball, source in [
+            ('cnf.mu2e.A.MDC2025ac.0.tar', 'data/MDC2025ac/stage1.json'),
+            ('cnf.mu2e.B.MDC2025ad.0.tar', 'data/MDC2025ad/stage1.json'),
+            ('cnf.mu2e.C.MDC2025ad.0.tar', 'stage1_extra.json'),
+            ('cnf.mu2e.D.MDC2025ad.0.tar', 'data/stage1/other.json'),
+            (None, None),
+        ]:
+            cls.session.add(Job(tarball=tarball, source_file=source))
+        cls.session.commit()
+
+    def _tarballs(self, pattern=None, campaign=None):
+        from utils.db_analyzer import _collect_jobs
+        return sorted(j.tarball for j in _collect_jobs(self.session, pattern, campaign))
+
+    def test_pattern_matches_basename_only(self):
+        self.assertEqual(self._tarballs('stage1'),
+                         ['cnf.mu2e.A.MDC2025ac.0.tar', 'cnf.mu2e.B.MDC2025ad.0.tar'])
+        self.assertEqual(self._tarballs('stage1*'),
+                         ['cnf.mu2e.A.MDC2025ac.0.tar', 'cnf.mu2e.B.MDC2025ad.0.tar',
+                          'cnf.mu2e.C.MDC2025ad.0.tar'])
+
+    def test_campaign_substring_and_combined(self):
+        self.assertEqual(self._tarballs(campaign='MDC2025ac'), ['cnf.mu2e.A.MDC2025ac.0.tar'])
+        self.assertEqual(self._tarballs('stage1', 'MDC2025ad'), ['cnf.mu2e.B.MDC2025ad.0.tar'])
+        self.assertEqual(self._tarballs(campaign='mdc2025ac'), [])
+
+    def test_info_map_batches_in_clause(self):
+        from utils.poms_db import get_db_session, Job, JobOutput, DatasetInfo
+        from utils import db_analyzer
+        s = get_db_session(None)
+        names = [f'dts.mu2e.D{i}.MDC2025ac.art' for i in range(5)]
+        job = Job(tarball='cnf.mu2e.D.MDC2025ac.0.tar')
+        job.outputs = [JobOutput(dataset=n) for n in names]
+        s.add(job)
+        s.add_all(DatasetInfo(dataset_name=n, nfiles=i) for i, n in enumerate(names))
+        s.commit()
+        with patch.object(db_analyzer, '_IN_BATCH', 2):
+            info_map = db_analyzer._build_dataset_info_map(s, [job])
+        self.assertEqual({n: r.nfiles for n, r in info_map.items()},
+                         {n: i for i, n in enumerate(names)})
+
+    def test_info_map_rows_feed_get_outputs(self):
+        from utils.poms_db import get_db_session, Job, JobOutput, DatasetInfo
+        from utils import db_analyzer
+        s = get_db_session(None)
+        job = Job(tarball='cnf.mu2e.A.MDC2025ac.0.tar', njobs=2)
+        job.outputs = [JobOutput(dataset='dts.mu2e.A.MDC2025ac.art', location='disk')]
+        s.add(job)
+        s.add(DatasetInfo(dataset_name='dts.mu2e.A.MDC2025ac.art', nfiles=2, nevts=10,
+                          total_size=4_000_000, location='dcache', has_children=True))
+        s.commit()
+        jobs = db_analyzer._collect_jobs(s, None)
+        info_map = db_analyzer._build_dataset_info_map(s, jobs)
+        self.assertTrue(info_map['dts.mu2e.A.MDC2025ac.art'].has_children)
+        self.assertEqual(db_analyzer._get_outputs(s, jobs[0], info_map),
+                         [('dts.mu2e.A.MDC2025ac.art', 2, 10, 4_000_000, 'N/A')])
+
+
+# ---------------------------------------------------------------------------
+# 44. process_all_for_dsconf --jobs (json2jobdef.py)
+# ---------------------------------------------------------------------------
+
+class _SerialExecutor:
+    """Stand-in for ProcessPoolExecutor that runs map() in-process, so the
+    worker body runs under the test's patches."""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables):
+        return list(map(fn, *iterables))
+
+
+class TestProcessAllParallel(unittest.TestCase):
+    """--jobs N builds each entry in a scratch dir; its tarball, chunks/ and
+    jobdefs-list entry must all land where the serial path puts them."""
+
+    def setUp(self):
+        import tempfile
+        self._orig_dir = os.getcwd()
+        self._tmpdir = os.path.realpath(tempfile.mkdtemp())
+        os.chdir(self._tmpdir)
+
+    def tearDown(self):
+        os.chdir(self._orig_dir)
+        import shutil
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def _run(self, configs):
+        from utils import json2jobdef
+
+        def build(config, job_args, json_output=False):
+            Path(json2jobdef.get_parfile_name(config)).write_text('tar')
+            return {'success': True, 'perl_commands': []}
+
+        args = types.SimpleNamespace(pushout=False, ignore_empty=False, jobs=2,
+                                     event_count_positive=False, jobdefs=None)
+        with patch.object(json2jobdef, 'ProcessPoolExecutor', _SerialExecutor), \
+             patch.object(json2jobdef, 'build_jobdef', side_effect=build), \
+             patch.object(json2jobdef, '_build_job_args', return_value=[]), \
+             patch.object(json2jobdef, 'list_files', return_value=['a.art']):
+            json2jobdef.process_all_for_dsconf(configs, 'MDC2025ac', args)
+
+    def _config(self, **kw):
+        return dict(simjob_setup='setup.sh', fcl='x.fcl', dsconf='MDC2025ac', owner='mu2e',
+                    njobs=1, outloc={'dts.mu2e.X.MDC2025ac.art': 'disk'}, **kw)
+
+    def test_desc_from_input_data(self):
+        self._run([self._config(input_data={f'dts.mu2e.{d}.MDC2025ab.art': 1})
+                   for d in ('A', 'B')])
+        tarballs = ['cnf.mu2e.A.MDC2025ac.0.tar', 'cnf.mu2e.B.MDC2025ac.0.tar']
+        entries = json.loads(Path('jobdefs_list.json').read_text())
+        self.assertEqual([e['tarball'] for e in entries], tarballs)
+        self.assertEqual(sorted(os.listdir('.')), tarballs + ['jobdefs_list.json'])
+
+    def test_split_lines_relative_source(self):
+        Path('pbi.txt').write_text('1\n2\n3\n')
+        self._run([self._config(desc='PBI', input_data={'pbi.txt': {'split_lines': 2}})])
+        self.assertTrue(Path('cnf.mu2e.PBI.MDC2025ac.0.tar').is_file())
+        self.assertEqual(sorted(os.listdir('chunks')),
+                         ['dts.mu2e.PBI.MDC2025ac.000000_00000000.txt',
+                          'dts.mu2e.PBI.MDC2025ac.000000_00000001.txt'])
+
+
+# ---------------------------------------------------------------------------
+# 45. parity_test workers (test/parity_test.py)
+# ---------------------------------------------------------------------------
+
+class TestParityParallel(unittest.TestCase):
+    """--jobs N runs each config in a scratch dir and collects its python/
+    and perl/ outputs under the starting directory."""
+
+    def setUp(self):
+        import tempfile
+        self._orig_dir = os.getcwd()
+        self._tmpdir = os.path.realpath(tempfile.mkdtemp())
+        os.chdir(self._tmpdir)
+
+    def tearDown(self):
+        os.chdir(self._orig_dir)
+        import shutil
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def test_outputs_collected_and_sources_resolved(self):
+        import parity_test
+        configs = [{'desc': d, 'input_data': {'pbi.txt': {'split_lines': 1}}} for d in ('A', 'B')]
+        Path('pbi.txt').write_text('1\n')
+
+        def create(config, json_file, worker):
+            self.assertTrue(Path(next(iter(config['input_data']))).is_file())
+            for folder in ('python', 'perl'):
+                os.makedirs(folder)
+                Path(folder, f"cnf.mu2e.{config['desc']}.MDC2025ac.0.tar").write_text('x')
+            return True
+
+        with patch.object(parity_test, 'load_json', return_value=configs), \
+             patch.object(parity_test, 'ProcessPoolExecutor', _SerialExecutor), \
+             patch.object(parity_test, 'create_jobdef', side_effect=create):
+            parity_test.create_jobdefs_from_json('configs.json', jobs=2)
+
+        for folder in ('python', 'perl'):
+            self.assertEqual(sorted(os.listdir(folder)),
+                             ['cnf.mu2e.A.MDC2025ac.0.tar', 'cnf.mu2e.B.MDC2025ac.0.tar'])
+        self.assertEqual(sorted(os.listdir('.')), ['pbi.txt', 'perl', 'python'])
+
+
+class TestShellWorker(unittest.TestCase):
+    """Each command runs isolated in the shared bash: its exit status is
+    returned and neither `exit` nor shell state reaches the next command."""
+
+    def setUp(self):
+        import parity_test
+        self.worker = parity_test.ShellWorker()
+        self.addCleanup(self.worker.close)
+
+    def test_nonzero_exit_and_exit_builtin(self):
+        r = self.worker.run('echo out; echo err >&2; false')
+        self.assertEqual((r.returncode, r.stdout.strip(), r.stderr.strip()), (1, 'out', 'err'))
+        self.assertEqual(self.worker.run('exit 3').returncode, 3)
+        self.assertEqual(self.worker.run('echo alive').stdout.strip(), 'alive')
+
+    def test_state_does_not_carry_over(self):
+        self.worker.run('cd /; export PARITY_X=1; set -e')
+        r = self.worker.run('echo "$PWD:${PARITY_X:-unset}"; false; echo next')
+        self.assertEqual(r.stdout.split(), [f"{os.getcwd()}:unset", 'next'])
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
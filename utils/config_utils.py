@@ -6,8 +6,6 @@ This module provides utilities for processing job configuration dictionaries,
 including description extraction and auto-generation from input data.
 """
 
-import copy
-
 from utils.job_common import Mu2eName
 
 
@@ -16,31 +14,24 @@ def _get_first_if_list(value):
     return value[0] if isinstance(value, list) and value else value
 
 
-def prepare_fields_for_job(config, job_type='standard'):
-    """Prepare job configuration by auto-generating desc from input_data and optional pbeam.
-    
+def derive_desc(config, job_type='standard'):
+    """Derive desc from input_data (plus pbeam for mixing jobs) without
+    copying or modifying config.
+
     Args:
         config: Configuration dictionary
         job_type: 'standard' or 'mixing'
-        
+
     Returns:
-        Modified copy of config with desc populated
+        The derived description string
     """
-    # Create a copy of the config to modify
-    modified_config = copy.deepcopy(config)
-    
-    # If desc is already present, don't override it
-    if 'desc' in config and config['desc']:
-        return modified_config
-    
-    # Auto-generate desc from input_data
     input_data = _get_first_if_list(config.get('input_data', ''))
     if not input_data:
         raise ValueError("input_data is required to auto-generate desc")
     
     if isinstance(input_data, dict):
         # New format: dict with dataset names as keys
-        dataset_name = list(input_data.keys())[0]
+        dataset_name = next(iter(input_data))
     else:
         # Old format: string dataset name
         dataset_name = input_data
@@ -53,12 +44,29 @@ def prepare_fields_for_job(config, job_type='standard'):
     
     # For mixing jobs, append pbeam to the desc
     if job_type == 'mixing':
-        pbeam = _get_first_if_list(config.get('pbeam', ''))
-        modified_config['desc'] = dsdesc + pbeam
-    else:
-        # For standard jobs (digi, reco, ntuple, etc.), just use the dataset name
-        modified_config['desc'] = dsdesc
+        return dsdesc + _get_first_if_list(config.get('pbeam', ''))
+    # For standard jobs (digi, reco, ntuple, etc.), just use the dataset name
+    return dsdesc
+
+
+def prepare_fields_for_job(config, job_type='standard'):
+    """Prepare job configuration by auto-generating desc from input_data and optional pbeam.
     
+    Args:
+        config: Configuration dictionary
+        job_type: 'standard' or 'mixing'
+        
+    Returns:
+        Modified copy of config with desc populated
+    """
+    # If desc is already present, don't override it
+    desc = config.get('desc') or derive_desc(config, job_type)
+
+    # Shallow copy: only top-level keys are set on the result. Nested values
+    # stay shared with config, so code that mutates one copies it first
+    # (e.g. json2jobdef._configure_chunk_mode's fcl_overrides).
+    modified_config = dict(config)
+    modified_config['desc'] = desc
     return modified_config
 
 
@@ -74,5 +82,5 @@ def get_tarball_desc(config):
     if 'tarball_append' not in config:
         return None
     
-    base_desc = config.get('desc') or prepare_fields_for_job(config, job_type='standard').get('desc')
+    base_desc = config.get('desc') or derive_desc(config, job_type='standard')
     return base_desc + config['tarball_append']
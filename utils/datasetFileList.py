@@ -4,26 +4,29 @@ Exact Python port of mu2eDatasetFileList Perl script.
 Lists files in a Mu2e dataset with the same behavior as the original.
 """
 
+import functools
 import os
 import sys
 import argparse
-from typing import List, Optional
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 # Handle both module and standalone imports
 try:
-    from .job_common import get_samweb_wrapper, Mu2eName
+    from .job_common import get_samweb_wrapper, Mu2eName, remove_storage_prefix, locate_files_batched
 except ImportError:
     # When running as standalone script
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from utils.job_common import get_samweb_wrapper, Mu2eName
+    from utils.job_common import get_samweb_wrapper, Mu2eName, remove_storage_prefix, locate_files_batched
 
 
+@functools.lru_cache(maxsize=256)
 def _dataset_dir(dsname: str, location: str) -> str:
     """Absolute /pnfs directory for a Mu2e dataset at the given location.
 
     Uses Mu2eName.tier_class (the authoritative tier→owner-class map) to
     derive the `phy-<class>` prefix. Returns '' for unknown locations.
+    Cached: auto-detect and path building ask for the same directories.
     """
     n = Mu2eName.parse(dsname)
     owner_prefix = "phy" if n.owner == "mu2e" else "usr"
@@ -117,41 +120,54 @@ def get_dataset_files(dataset_name: str, location: Optional[str] = None) -> List
     # Standard locations
     stdloc = ['disk', 'tape', 'scratch']
     
-    # Get files from SAM
     samweb = get_samweb_wrapper()
-    fns = samweb.list_files(f"dh.dataset {dataset_name}")
-    
-    if not fns:
-        raise RuntimeError(f"No files with dh.dataset={dataset_name} are registered in SAM.")
-    
+    query = f"dh.dataset {dataset_name}"
+
     # Determine location
     if location:
         fileloc = location
+        fns = samweb.list_files(query)
     else:
-        # Auto-detect: check which location directory exists
-        fileloc = None
-        for loc in stdloc:
-            if os.path.isdir(_dataset_dir(dataset_name, loc)):
-                fileloc = loc
-                break
-        if not fileloc:
-            raise RuntimeError(f"Dataset {dataset_name} not found in any standard location")
-
-    # Construct paths
+        # Auto-detect: check which location directory exists. The /pnfs
+        # stats block on dCache, so probe all locations at once, overlapped
+        # with the SAM listing, and keep the first hit in stdloc order.
+        with ThreadPoolExecutor(max_workers=len(stdloc) + 1) as executor:
+            listing = executor.submit(samweb.list_files, query)
+            found = list(executor.map(os.path.isdir,
+                                      [_dataset_dir(dataset_name, loc) for loc in stdloc]))
+            fns = listing.result()
+        fileloc = next((loc for loc, ok in zip(stdloc, found) if ok), None)
+
+    if not fns:
+        raise RuntimeError(f"No files with dh.dataset={dataset_name} are registered in SAM.")
+
+    if not fileloc:
+        raise RuntimeError(f"Dataset {dataset_name} not found in any standard location")
+
+    # Construct paths: same layout as Mu2eName.relpathname(), without
+    # building a Mu2eName per SAM-registered (already valid) filename
     locroot = _dataset_dir(dataset_name, fileloc)
-    file_paths = []
+    return [f"{locroot}/{Mu2eName.hash_prefix(f)}/{f}" for f in sorted(fns)]
+
 
-    for f in sorted(fns):
-        relpath = Mu2eName.parse(f).relpathname()
-        full_path = f"{locroot}/{relpath}"
-        file_paths.append(full_path)
+def _first_path(filename: str, locations: List[Dict]) -> Optional[str]:
+    """Full path of `filename` at its first absolute location, or None."""
+    for location_info in locations or ():
+        if not isinstance(location_info, dict) or 'full_path' not in location_info:
+            continue
+        full_path = remove_storage_prefix(location_info['full_path'])
+        if full_path.startswith('/'):
+            # Known absolute: plain concatenation, no os.path.join needed
+            return f"{full_path.rstrip('/')}/{filename}"
+    return None
 
-    return file_paths
 
 def get_definition_files(definition_name: str) -> List[str]:
     """
     Get file paths for a SAM definition.
     
+    Files are located in batches (see job_common.locate_files_batched).
+    
     Args:
         definition_name: SAM definition name (e.g., log.mu2e.X.Y.log)
     
@@ -159,35 +175,19 @@ def get_definition_files(definition_name: str) -> List[str]:
         List of full file paths
     """
     samweb = get_samweb_wrapper()
-    fns = samweb.list_definition_files(definition_name)
-    
-    file_paths = []
-    for f in sorted(fns):
-        try:
-            locations = samweb.locate_files([f])
-            
-            if f not in locations or not locations[f]:
-                continue
-            
-            for location_info in locations[f]:
-                if not isinstance(location_info, dict) or 'full_path' not in location_info:
-                    continue
-                
-                full_path = location_info['full_path']
-                
-                # Remove storage system prefixes
-                from utils.job_common import remove_storage_prefix
-                full_path = remove_storage_prefix(full_path)
-                
-                if full_path.startswith('/'):
-                    final_path = os.path.join(full_path, f)
-                    file_paths.append(final_path)
-                    break  # Take first valid location
-                    
-        except Exception:
-            continue
-    
-    return file_paths
+    fns = sorted(samweb.list_definition_files(definition_name))
+    locations = locate_files_batched(samweb.locate_files, fns)
+    return [path for path in (_first_path(f, locations.get(f)) for f in fns) if path]
+
+def _write_lines(lines: List[str]) -> None:
+    """Write `lines` to stdout in one call instead of a print() per line."""
+    if not lines:
+        return
+    try:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        pass
 
 def main():
     """Main function that replicates the exact behavior of the Perl script."""
@@ -198,21 +198,12 @@ def main():
     if args.basename:
         samweb = get_samweb_wrapper()
         fns = samweb.list_files(f"dh.dataset {dsname}")
-        for f in sorted(fns):
-            try:
-                print(f)
-            except BrokenPipeError:
-                break
+        _write_lines(sorted(fns))
         return
     
     # Handle --defname mode (use get_definition_files helper)
     if args.defname:
-        file_paths = get_definition_files(dsname)
-        for final_path in file_paths:
-            try:
-                    print(final_path)
-            except BrokenPipeError:
-                break
+        _write_lines(get_definition_files(dsname))
         return
     
     # Regular mode - use get_dataset_files()
@@ -230,11 +221,7 @@ def main():
         file_paths = get_dataset_files(dsname, location)
         
         # Print results
-        for full_path in file_paths:
-            try:
-                print(full_path)
-            except BrokenPipeError:
-                break
+        _write_lines(file_paths)
                 
     except RuntimeError as e:
         print(f"Error: {e}", file=sys.stderr)
@@ -3,14 +3,23 @@
 from __future__ import annotations
 
 import os
+import re
 import sys
 import fnmatch
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Optional, Dict
 
+from sqlalchemy import func, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import selectinload
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from .poms_db import Job, JobOutput, DatasetInfo
+from .job_common import locate_threads
+from .poms_db import Job, JobOutput, DatasetInfo, LocationCache
 from .samweb_wrapper import list_definition_files, locate_file_full
 
 
@@ -19,21 +28,59 @@ def get_default_db_path() -> str:
     return os.path.join(repo_root, "poms_data.db")
 
 
+@functools.lru_cache(maxsize=32)
+def _pattern_matcher(pattern: str):
+    """Compiled matcher for `<pattern>.json`, translated once per pattern."""
+    return re.compile(fnmatch.translate(f"{pattern}.json")).match
+
+
 def _matches_pattern(job: Job, pattern: Optional[str]) -> bool:
     if not pattern:
         return True
     source = os.path.basename(job.source_file) if job.source_file else ''
-    return fnmatch.fnmatch(source, f"{pattern}.json")
+    return _pattern_matcher(pattern)(source) is not None
 
 
-def _collect_jobs(session, pattern: Optional[str]):
-    jobs = session.query(Job).all()
+def _collect_jobs(session, pattern: Optional[str], campaign: Optional[str] = None):
+    """Jobs whose source json matches `pattern` and whose tarball,
+    fcl_template or source_file contains `campaign`.
+
+    Both filters run in SQLite. GLOB is case-sensitive with fnmatch's `*`/`?`,
+    but its `*` also crosses '/', so it only narrows the rows and
+    _matches_pattern still decides on the basename. Patterns with `[`
+    classes (whose negation syntax differs) are matched in Python only.
+    """
+    # Outputs are read for every job (_build_dataset_info_map, _get_outputs);
+    # load them in one IN query instead of one lazy query per job.
+    query = session.query(Job).options(selectinload(Job.outputs))
+    if pattern and '[' not in pattern:
+        query = query.filter(or_(Job.source_file.op('GLOB')(f"{pattern}.json"),
+                                 Job.source_file.op('GLOB')(f"*/{pattern}.json")))
+    if campaign:
+        query = query.filter(or_(func.instr(Job.tarball, campaign) > 0,
+                                 func.instr(Job.fcl_template, campaign) > 0,
+                                 func.instr(Job.source_file, campaign) > 0))
+    jobs = query.all()
     if pattern:
         jobs = [job for job in jobs if _matches_pattern(job, pattern)]
     return jobs
 
 
+# Dataset names per IN (...) query
+_IN_BATCH = 500
+# How long a location inferred from SAM is reused from the location_cache table
+_LOCATION_TTL = timedelta(hours=24)
+# DatasetInfo fields list_jobs reads; rows come back as named tuples
+_INFO_COLUMNS = (
+    DatasetInfo.dataset_name, DatasetInfo.nfiles, DatasetInfo.nevts,
+    DatasetInfo.total_size, DatasetInfo.location,
+    DatasetInfo.has_children, DatasetInfo.ignored,
+)
+
+
 def _build_dataset_info_map(session, jobs):
+    """dataset name -> row of _INFO_COLUMNS (attribute access like DatasetInfo,
+    without building and identity-mapping full ORM objects)."""
     dataset_names = {
         output.dataset
         for job in jobs
@@ -42,12 +89,17 @@ def _build_dataset_info_map(session, jobs):
     }
     if not dataset_names:
         return {}
-    infos = (
-        session.query(DatasetInfo)
-        .filter(DatasetInfo.dataset_name.in_(dataset_names))
-        .all()
-    )
-    return {info.dataset_name: info for info in infos}
+    # Bounded IN lists: stays under SQLITE_MAX_VARIABLE_NUMBER (999 on
+    # older builds) however many datasets the selected jobs produce
+    names = sorted(dataset_names)
+    info_map = {}
+    for i in range(0, len(names), _IN_BATCH):
+        rows = (
+            session.query(*_INFO_COLUMNS)
+            .filter(DatasetInfo.dataset_name.in_(names[i:i + _IN_BATCH]))
+        )
+        info_map.update((row.dataset_name, row) for row in rows)
+    return info_map
 
 
 _location_cache: Dict[str, str] = {}
@@ -89,7 +141,62 @@ def _infer_location(dataset: str) -> str:
     return location
 
 
-def _get_outputs(session, job: Job, info_map: dict[str, DatasetInfo]) -> list:
+def _load_cached_locations(session, names: list) -> None:
+    """Seed _location_cache from location_cache rows newer than _LOCATION_TTL.
+    A database without the table (e.g. read-only, never upgraded) is a miss."""
+    cutoff = datetime.now() - _LOCATION_TTL
+    try:
+        for i in range(0, len(names), _IN_BATCH):
+            rows = (
+                session.query(LocationCache.dataset, LocationCache.location)
+                .filter(LocationCache.dataset.in_(names[i:i + _IN_BATCH]),
+                        LocationCache.updated_at >= cutoff)
+            )
+            _location_cache.update((row.dataset, row.location) for row in rows)
+    except OperationalError:
+        session.rollback()
+
+
+def _store_locations(session, names: list) -> None:
+    """Persist inferred locations. 'N/A' (lookup failed or found nothing) is
+    not stored, so a transient SAM error is retried on the next run. A cache
+    write failure (e.g. read-only DB) never fails the listing."""
+    now = datetime.now()
+    try:
+        for name in names:
+            location = _location_cache.get(name)
+            if location and location != 'N/A':
+                session.merge(LocationCache(dataset=name, location=location, updated_at=now))
+        session.commit()
+    except OperationalError:
+        session.rollback()
+
+
+def _prefetch_locations(session, jobs, info_map: dict) -> None:
+    """Fill _location_cache for every output that _get_outputs would have to
+    infer: first from the on-disk location_cache table, then with up to
+    locate_threads() concurrent SAM lookups for the rest, which are written
+    back to the table."""
+    missing = {
+        output.dataset
+        for job in jobs
+        for output in job.outputs
+        if output.dataset and not output.location
+        and not getattr(info_map.get(output.dataset), 'location', None)
+        and output.dataset not in _location_cache
+    }
+    if not missing:
+        return
+    _load_cached_locations(session, sorted(missing))
+    missing = sorted(missing.difference(_location_cache))
+    if not missing:
+        return
+    with ThreadPoolExecutor(max_workers=min(locate_threads(), len(missing))) as executor:
+        list(executor.map(_infer_location, missing))
+    _store_locations(session, missing)
+
+
+def _get_outputs(session, job: Job, info_map: dict) -> list:
     outputs = []
     for output in job.outputs:
         dataset = output.dataset
@@ -108,6 +215,11 @@ def _get_outputs(session, job: Job, info_map: dict[str, DatasetInfo]) -> list:
     return outputs
 
 
+# list_jobs --show-outputs row colours
+_GREY, _YELLOW, _GREEN, _RED, _RESET = '\033[90m', '\033[93m', '\033[92m', '\033[91m', '\033[0m'
+_OUTPUT_RULE = "         " + "-" * 80
+
+
 def list_jobs(
     session,
     *,
@@ -122,16 +234,7 @@ def list_jobs(
     since=None,
     needs_processing: bool = False,
 ) -> None:
-    jobs = _collect_jobs(session, pattern)
-
-    if campaign:
-        jobs = [
-            job
-            for job in jobs
-            if (job.tarball and campaign in job.tarball)
-            or (job.fcl_template and campaign in job.fcl_template)
-            or (job.source_file and campaign in job.source_file)
-        ]
+    jobs = _collect_jobs(session, pattern, campaign)
 
     if since is not None:
         # Keep job if at least one output dataset was created after `since`
@@ -169,6 +272,7 @@ def list_jobs(
         jobs.sort(key=lambda j: j.source_file or '')
 
     info_map = _build_dataset_info_map(session, jobs)
+    _prefetch_locations(session, jobs, info_map)
     total = sum(job.njobs or 0 for job in jobs)
 
     if campaign:
@@ -188,10 +292,13 @@ def list_jobs(
             print(f"{'NJOBS':>8} {'INLOC':<8} {'OUTLOC':<8} {'JSON FILE':<25} {'TARBALL':<80}")
             print(f"{'-----':>8} {'-----':<8} {'------':<8} {'---------':<25} {'-------':<80}")
 
+    # Rows are collected and written once at the end, not print()ed per line
+    lines = []
     for job in jobs:
         outputs = _get_outputs(session, job, info_map)
+        threshold = job.njobs or 0
         is_complete = all(
-            nfiles >= (job.njobs or 0) for _, nfiles, _, _, _ in outputs
+            nfiles >= threshold for _, nfiles, _, _, _ in outputs
         ) if outputs else False
         if (complete_only and not is_complete) or (incomplete_only and is_complete):
             continue
@@ -203,13 +310,12 @@ def list_jobs(
         if show_outputs:
             outloc = first_location
             if datasets_only:
-                for dataset_name, _, _, _, _ in outputs:
-                    print(dataset_name)
+                lines.extend(dataset_name for dataset_name, _, _, _, _ in outputs)
             else:
-                print(f"{job.njobs or 0:>8} {'':>10} {'':>14} {'':>6}    {display_name:<80}")
+                lines.append(f"{threshold:>8} {'':>10} {'':>14} {'':>6}    {display_name:<80}")
                 for dataset_name, nfiles, nevts, total_size, location in outputs:
                     avg_size_mb = (total_size / nfiles / 1e6) if nfiles else 0
-                    is_complete_out = nfiles >= (job.njobs or 0)
+                    is_complete_out = nfiles >= threshold
                     info = info_map.get(dataset_name)
                     is_ignored = info is not None and info.ignored
                     is_unprocessed = (
@@ -220,23 +326,25 @@ def list_jobs(
                         and not is_ignored
                     )
                     if is_ignored:
-                        color = '\033[90m'  # dark grey = ignored
+                        color = _GREY  # ignored
                     elif is_unprocessed:
-                        color = '\033[93m'  # yellow = complete but no children
+                        color = _YELLOW  # complete but no children
                     elif is_complete_out:
-                        color = '\033[92m'  # green = complete
+                        color = _GREEN  # complete
                     else:
-                        color = '\033[91m'  # red = incomplete
-                    reset = '\033[0m'
+                        color = _RED  # incomplete
                     padded_dataset = f"  {dataset_name}"
-                    print(
+                    lines.append(
                         f"{nfiles:>8} {nevts:>10.2e} {avg_size_mb:>14.2f} "
-                        f"{location or outloc:<6} {color}{padded_dataset:<100}{reset}"
+                        f"{location or outloc:<6} {color}{padded_dataset:<100}{_RESET}"
                     )
-                print("         " + "-" * 80)
+                lines.append(_OUTPUT_RULE)
         else:
             source_file = os.path.basename(job.source_file) if job.source_file else 'N/A'
-            print(f"{job.njobs or 0:>8} {job.inloc or 'N/A':<8} {first_location:<8} {source_file:<25} {display_name:<80}")
+            lines.append(f"{threshold:>8} {job.inloc or 'N/A':<8} {first_location:<8} {source_file:<25} {display_name:<80}")
+
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def ignore_dataset(session, dataset_name: str, reason: str = None) -> bool:
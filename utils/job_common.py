@@ -6,11 +6,14 @@ This module consolidates common functionality that was previously duplicated
 across multiple files to reduce code redundancy and ensure consistency.
 """
 
+import functools
 import json
+import os
 import re
 import tarfile
 import hashlib
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 
 # Mu2e dataset path puts every tier under one of four umbrella owner-classes.
@@ -24,6 +27,20 @@ _TIER_TO_OWNER_CLASS = {
 
 _CAMPAIGN_RE = re.compile(r"^(MDC\d{4}[a-z]*|Run\d+[A-Z]?[a-z]*)")
 
+# Ceiling on pool sizes read from the environment, to avoid overloading SAM / dCache
+THREADS_MAX = 24
+# Files per samweb locate_files request
+LOCATE_BATCH = 256
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _hash_prefix(filename: str) -> str:
+    """'ab/cd' dCache spreader dirs for a filename; cached since file lists
+    resolve the same names repeatedly (locate, format, copy)."""
+    # Only the first two digest bytes are used; skip the 64-char hexdigest
+    d = hashlib.sha256(filename.encode()).digest()
+    return f"{d[0]:02x}/{d[1]:02x}"
+
 
 class Mu2eName:
     """Parse and build Mu2e dot-names (file / dataset / tarball).
@@ -191,10 +208,14 @@ class Mu2eName:
     def basename(self) -> str:
         return self.filename
 
+    @staticmethod
+    def hash_prefix(filename: str) -> str:
+        """'ab/cd' SHA256 spreader dirs for `filename`, as used by relpathname()."""
+        return _hash_prefix(filename)
+
     def relpathname(self) -> str:
         """SHA256 hash-prefixed relative path, matching Perl Mu2eFilename->relpathname()."""
-        h = hashlib.sha256(self.filename.encode()).hexdigest()
-        return f"{h[:2]}/{h[2:4]}/{self.filename}"
+        return f"{self.hash_prefix(self.filename)}/{self.filename}"
 
 
 # Legacy alias — preserves the Perl-parity association on the original symbol.
@@ -239,10 +260,14 @@ class Mu2eJobBase:
     per-job input file lists (primary / aux / sampling).
     """
 
-    def __init__(self, jobdef_path: str):
-        """Initialize with path to job definition tarball; extract jobpars.json."""
+    def __init__(self, jobdef_path: str, json_data: Optional[dict] = None):
+        """Initialize with path to job definition tarball; extract jobpars.json.
+
+        Pass `json_data` to reuse an already-parsed jobpars.json (treated as
+        read-only) instead of re-opening the tarball.
+        """
         self.jobdef = jobdef_path
-        self.json_data = self._extract_json()
+        self.json_data = json_data if json_data is not None else self._extract_json()
 
     def _extract_json(self) -> dict:
         """Extract jobpars.json from tar file.
@@ -389,3 +414,41 @@ def get_samweb_wrapper():
         from utils.samweb_wrapper import get_samweb_wrapper as _get_samweb_wrapper
     return _get_samweb_wrapper()
 
+
+def env_threads(name: str, default: int = 8) -> int:
+    """Pool size from environment variable `name` (default `default`),
+    clamped to 1..THREADS_MAX."""
+    n = int(os.environ.get(name, str(default)))
+    return min(max(1, n), THREADS_MAX)
+
+
+def locate_threads() -> int:
+    """Concurrent SAM locate requests (MU2E_LOCATE_CONCURRENCY)."""
+    return env_threads("MU2E_LOCATE_CONCURRENCY")
+
+
+def locate_files_batched(locate_files: Callable, filenames: List[str]) -> Dict[str, List[Dict]]:
+    """Locate `filenames` with a samweb `locate_files`, LOCATE_BATCH per
+    request and up to locate_threads() requests in flight; a batch whose
+    request fails is retried file by file.
+
+    Returns:
+        Dict mapping filename to its list of location dictionaries
+    """
+    batches = [filenames[i:i + LOCATE_BATCH] for i in range(0, len(filenames), LOCATE_BATCH)]
+
+    def locate_batch(batch):
+        found = locate_files(batch)
+        if not found and len(batch) > 1:
+            # The wrapper returns {} on error; fall back to per-file requests
+            found = {}
+            for f in batch:
+                found.update(locate_files([f]))
+        return found
+
+    locations = {}
+    with ThreadPoolExecutor(max_workers=locate_threads()) as executor:
+        for found in executor.map(locate_batch, batches):
+            locations.update(found)
+    return locations
+
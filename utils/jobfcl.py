@@ -17,18 +17,10 @@ import re
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.job_common import Mu2eName, Mu2eJobBase, remove_storage_prefix
+# Stash/resilient roots are read from the environment per call, not bound here
+from utils.stash_utils import stash_read_root, read_path_for_file, resilient_path_for_file
 import samweb_client  # type: ignore
 
-STASH_READ_ROOT = os.environ.get(
-    "MU2E_STASH_READ",
-    "/cvmfs/mu2e.osgstorage.org/pnfs/fnal.gov/usr/mu2e/persistent/stash"
-)
-
-RESILIENT_ROOT = os.environ.get(
-    "MU2E_RESILIENT",
-    "/pnfs/mu2e/resilient"
-)
-
 
 _OUTPUT_FILENAME_KEY_RE = re.compile(r'^outputs\.\w+\.fileName$')
 _PLACEHOLDER_TOKEN_RE = re.compile(r'\b(description|desc|owner|version|sequencer)\b')
@@ -81,9 +73,10 @@ def _resilient_file_exists(pnfs_path: str) -> bool:
 class Mu2eJobFCL(Mu2eJobBase):
     """Python port of mu2ejobfcl functionality."""
     
-    def __init__(self, jobdef: str, inloc: str = 'tape', proto: str = 'file'):
+    def __init__(self, jobdef: str, inloc: str = 'tape', proto: str = 'file',
+                 json_data: Optional[dict] = None):
         """Initialize with job definition file."""
-        super().__init__(jobdef)
+        super().__init__(jobdef, json_data=json_data)
         self.inloc = inloc
         self.proto = proto
 
@@ -144,15 +137,13 @@ class Mu2eJobFCL(Mu2eJobBase):
         # Resolve stash path from filename — no SAM involved
         # If file not found on stash, fall back to SAM-based lookup
         if self.inloc == 'stash':
-            ds_path = str(Mu2eName.parse(filename).dataset).replace('.', '/')
-            stash_path = f"{STASH_READ_ROOT}/datasets/{ds_path}/{filename}"
+            stash_path = read_path_for_file(filename)
             if os.path.exists(stash_path):
                 return stash_path
             # File not on stash — fall through to SAM lookup
 
         if self.inloc == 'resilient':
-            ds_path = str(Mu2eName.parse(filename).dataset).replace('.', '/')
-            resilient_path = f"{RESILIENT_ROOT}/datasets/{ds_path}/{filename}"
+            resilient_path = resilient_path_for_file(filename)
             if _resilient_file_exists(resilient_path):
                 return resilient_path
             # File not on resilient — fall through to SAM lookup
@@ -194,7 +185,7 @@ class Mu2eJobFCL(Mu2eJobBase):
         if self.inloc == 'stash':
             path = self._locate_file(filename)
             # If path is a stash CVMFS path, return as-is (no xroot needed)
-            if path.startswith(STASH_READ_ROOT):
+            if path.startswith(stash_read_root()):
                 return path
             # Fell back to SAM — apply root protocol below
             physical_path = path
@@ -16,9 +16,9 @@ from utils.job_common import Mu2eJobBase, Mu2eName
 class Mu2eJobPars(Mu2eJobBase):
     """Python equivalent of Mu2eJobPars.pm"""
     
-    def __init__(self, parfile):
+    def __init__(self, parfile, json_data=None):
         """Initialize with a job parameter file (.tar)"""
-        super().__init__(parfile)
+        super().__init__(parfile, json_data=json_data)
         self.parfile = parfile  # Keep for backward compatibility
 
     def jobname(self):
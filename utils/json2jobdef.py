@@ -15,15 +15,18 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import argparse
 import json
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from utils.prod_utils import *
 from utils.mixing_utils import *
-from utils.config_utils import get_tarball_desc, prepare_fields_for_job
+from utils.config_utils import get_tarball_desc, prepare_fields_for_job, derive_desc
 from utils.jobquery import Mu2eJobPars
 from utils.jobdef import create_jobdef, get_output_dataset_names
 from utils.jobfcl import validate_output_filenames
 from utils.samweb_wrapper import list_files, count_files, locate_file
 
+_LOG = logging.getLogger()
+
 
 def _write_random_selection(out_f, query: str, total_needed: int, seed_source: str):
     """Write deterministic pseudo-random selection of files."""
@@ -75,7 +78,8 @@ def _configure_chunk_mode(config):
 
     local_chunk = 'chunk.txt'
     config['njobs'] = njobs
-    config.setdefault('fcl_overrides', {})
+    # Fresh dict: the incoming fcl_overrides may be shared with sibling jobs
+    config['fcl_overrides'] = dict(config.get('fcl_overrides') or {})
     config['fcl_overrides'].setdefault('source.fileNames', [local_chunk])
     config['chunk_mode'] = {
         'source': str(src),
@@ -402,7 +406,7 @@ def build_jobdef(config, job_args, json_output=False):
     cmd_parts.extend(['--embed', 'template.fcl'])
     
     # Always show the mu2ejobdef equivalent command when verbose logging is enabled
-    if logging.getLogger().level <= logging.DEBUG:
+    if _LOG.isEnabledFor(logging.DEBUG):
         print(f"🐪 mu2ejobdef equivalent command: {' '.join(cmd_parts)}")
     
     # Now create jobdef using the template.fcl
@@ -491,6 +495,38 @@ def append_jobdef(config, jobdefs_file=None):
     # Write JSON entry to file
     _write_jobdef_json_entry(jobdef_entry, jobdefs_file)
 
+# Parsed jobdefs-list files, keyed by path: (mtime_ns, size, entries, tarballs).
+# process_all_for_dsconf appends one entry per config to the same file, so
+# re-parsing it on every call would make a dsconf run quadratic in its size.
+_jobdefs_file_cache = {}
+
+
+def _load_jobdefs_entries(dsconf_file):
+    """Return (entries, tarball-name set) for a jobdefs-list JSON file, reusing
+    the cached parse while the file is unchanged on disk."""
+    key = os.path.abspath(dsconf_file)
+    try:
+        st = dsconf_file.stat()
+    except FileNotFoundError:
+        _jobdefs_file_cache.pop(key, None)
+        return [], set()
+
+    cached = _jobdefs_file_cache.get(key)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2], cached[3]
+
+    existing_entries = []
+    try:
+        existing_content = dsconf_file.read_text()
+        if existing_content.strip():
+            existing_entries = json.loads(existing_content)
+            if not isinstance(existing_entries, list):
+                existing_entries = [existing_entries]
+    except json.JSONDecodeError:
+        print(f"Warning: Could not parse existing {dsconf_file}, starting fresh")
+        existing_entries = []
+    return existing_entries, {e.get("tarball") for e in existing_entries}
+
 def _write_jobdef_json_entry(jobdef_entry, jobdefs_file=None):
     """Helper function to write jobdef entries in JSON format."""
     # Use provided jobdefs file or default to jobdefs_list.json
@@ -499,31 +535,24 @@ def _write_jobdef_json_entry(jobdef_entry, jobdefs_file=None):
     else:
         dsconf_file = Path("jobdefs_list.json")
     
-    # Check if file exists and load existing entries
-    existing_entries = []
-    if dsconf_file.exists():
-        try:
-            existing_content = dsconf_file.read_text()
-            if existing_content.strip():
-                existing_entries = json.loads(existing_content)
-                if not isinstance(existing_entries, list):
-                    existing_entries = [existing_entries]
-        except json.JSONDecodeError:
-            print(f"Warning: Could not parse existing {dsconf_file}, starting fresh")
-            existing_entries = []
+    # Load existing entries (cached across calls while the file is unchanged)
+    existing_entries, tarballs = _load_jobdefs_entries(dsconf_file)
     
     # Check for duplicate tarball entries
     tarball_name = jobdef_entry["tarball"]
-    for existing in existing_entries:
-        if existing.get("tarball") == tarball_name:
-            print(f"Entry already exists in {dsconf_file}")
-            return
+    if tarball_name in tarballs:
+        print(f"Entry already exists in {dsconf_file}")
+        return
     
     # Add new entry and write back to file
     existing_entries.append(jobdef_entry)
+    tarballs.add(tarball_name)
     
     with open(dsconf_file, 'w') as f:
         json.dump(existing_entries, f, indent=2)
+
+    st = dsconf_file.stat()
+    _jobdefs_file_cache[os.path.abspath(dsconf_file)] = (st.st_mtime_ns, st.st_size, existing_entries, tarballs)
     
     print(f"Added JSON entry for {tarball_name} to {dsconf_file}")
 
@@ -547,6 +576,8 @@ def main():
                         '(legacy behavior). Default is to include all files.')
     p.add_argument('--ignore-empty', action='store_true',
                    help='Skip entries whose input datasets have no files instead of failing')
+    p.add_argument('--jobs', type=int, default=1,
+                   help='With --dsconf only: build up to N entries in parallel (default: 1)')
     args = p.parse_args()
     
     # If --prod is specified, enable pushout
@@ -627,7 +658,7 @@ def _build_job_args(config):
             input_data = config['input_data']
             if not isinstance(input_data, dict):
                 raise ValueError(f"input_data must be a dict, got {type(input_data)}")
-            first_dataset = list(input_data.keys())[0]
+            first_dataset = next(iter(input_data))
             nfiles, nevts = get_def_counts(first_dataset)
             config['_max_events_to_skip'] = nevts // nfiles
         except Exception as e:
@@ -666,7 +697,7 @@ def _pushout_to_sam(parfile_name):
     print(f"Pushing {parfile_name} to SAM...")
     with open('outputs.txt', 'w') as f:
         f.write(f"disk {parfile_name} none\n")
-    run('pushOutput outputs.txt', shell=True)
+    run(['pushOutput', 'outputs.txt'])
 
 
 def _cleanup_temp_files():
@@ -732,6 +763,9 @@ def process_single_entry(config, json_output=True, pushout=False, no_cleanup=Tru
 
     append_jobdef(config, jobdefs_list)
     parfile_name = get_parfile_name(config)
+    if result is not None:
+        # config may be a desc-filled copy; callers can't rebuild the name
+        result['parfile'] = parfile_name
 
     if pushout:
         _pushout_to_sam(parfile_name)
@@ -758,12 +792,8 @@ def is_already_expanded(configs):
         if not isinstance(config, dict):
             raise ValueError(f"Entry {i} is not a dictionary: {type(config)}")
         
-        # Check if this config has lists (needs expansion)
-        values = list(config.values())
-        has_lists = any(isinstance(v, list) for v in values)
-        
         # If any config has lists, the whole configuration needs expansion
-        if has_lists:
+        if any(isinstance(v, list) for v in config.values()):
             return False
     
     # If no configs have lists, they're all already expanded
@@ -771,8 +801,9 @@ def is_already_expanded(configs):
 
 def load_json(json_path):
     """Load and expand JSON configuration if needed"""
-    json_text = json_path.read_text()
-    configs = json.loads(json_text)
+    # Parse straight from the binary file object; no intermediate str copy
+    with json_path.open('rb') as f:
+        configs = json.load(f)
     
     # Check if expansion is needed
     if is_already_expanded(configs):
@@ -794,8 +825,47 @@ def find_json_entry(configs, desc=None, dsconf=None, index=None):
         sys.exit(f"Expected 1 match for desc={desc}, dsconf={dsconf}; found {len(matches)}.")
     return matches[0]
 
+def resolve_input_paths(config):
+    """Copy of `config` with relative split_lines / chunk_lines source paths
+    made absolute, so the entry builds the same from any cwd."""
+    input_data = config.get('input_data')
+    if not isinstance(input_data, dict):
+        return config
+    resolved = {}
+    for src, spec in input_data.items():
+        if isinstance(spec, dict) and ('split_lines' in spec or 'chunk_lines' in spec):
+            src = os.path.abspath(src)
+        resolved[src] = spec
+    return {**config, 'input_data': resolved}
+
+def _process_entry_isolated(config, outdir, kwargs):
+    """Run process_single_entry in a private scratch dir under `outdir`.
+
+    Worker-process body for `process_all_for_dsconf --jobs N`: every entry
+    writes template.fcl / inputs.txt / *Cat.txt into cwd, so concurrent
+    entries each get their own. The built tarball and any split_lines
+    `chunks/` are moved back to `outdir`; the jobdefs-list entry is returned
+    (not written) so the parent can append entries in input order.
+
+    Returns:
+        tuple: (result, list of jobdefs-list entries written by this entry)
+    """
+    with scratch_cwd(outdir, 'json2jobdef.', keep=['chunks']) as keep:
+        result = process_single_entry(config, jobdefs_list='jobdefs_list.json', **kwargs)
+        entries = []
+        if Path('jobdefs_list.json').exists():
+            entries = json.loads(Path('jobdefs_list.json').read_text())
+        if result:
+            keep.append(result['parfile'])
+    return result, entries
+
 def process_all_for_dsconf(expanded_configs, dsconf, args):
-    """Process all entries matching the specified dsconf and generate job definitions for all permutations"""
+    """Process all entries matching the specified dsconf and generate job definitions for all permutations.
+
+    With `args.jobs > 1` the entries are built concurrently in a process
+    pool (each in its own scratch dir, see _process_entry_isolated); the
+    jobdefs list is still written in input order.
+    """
     
     # Filter to only entries matching the specified dsconf (exact match)
     matching_configs = [config for config in expanded_configs if config.get('dsconf', '') == dsconf]
@@ -804,6 +874,11 @@ def process_all_for_dsconf(expanded_configs, dsconf, args):
         sys.exit(f"No entries found matching dsconf: {dsconf}")
     
     print(f"Found {len(matching_configs)} entries matching dsconf: {dsconf}")
+
+    entry_kwargs = dict(json_output=True, pushout=args.pushout, no_cleanup=True,
+                        ignore_empty=args.ignore_empty)
+    njobs = max(1, getattr(args, 'jobs', 1) or 1)
+    runnable = []
     
     # Process each matching configuration using the existing process_single_entry function
     for i, config in enumerate(matching_configs):
@@ -811,8 +886,7 @@ def process_all_for_dsconf(expanded_configs, dsconf, args):
         display_desc = get_tarball_desc(config) or config.get('desc')
         if not display_desc:
             # Fall back to extracting from input_data
-            temp_config = prepare_fields_for_job(config, job_type='standard')
-            display_desc = temp_config.get('desc', 'Unknown')
+            display_desc = derive_desc(config, job_type='standard')
         print(f"\nProcessing entry {i+1}/{len(matching_configs)}: {display_desc}")
         
         # Check required fields before calling process_single_entry
@@ -825,19 +899,35 @@ def process_all_for_dsconf(expanded_configs, dsconf, args):
         # Propagate CLI options that affect input selection onto the config
         config['_event_count_positive'] = args.event_count_positive
 
+        if njobs > 1:
+            # Workers build in scratch dirs, so pin relative sources to cwd now
+            runnable.append(resolve_input_paths(config))
+            continue
+
         # Use the existing process_single_entry function
         process_single_entry(
             config,
-            json_output=True,
-            pushout=args.pushout,
-            no_cleanup=True,
             jobdefs_list=args.jobdefs,
-            ignore_empty=args.ignore_empty,
+            **entry_kwargs,
         )
         
         # Clean up template.fcl for next iteration (since process_single_entry cleans up)
         if Path('template.fcl').exists():
             Path('template.fcl').unlink()
 
+    if not runnable:
+        return
+
+    # Workers pull the next entry as they finish; map() yields in input order
+    outdir = os.getcwd()
+    workers = min(njobs, len(runnable))
+    print(f"\nBuilding {len(runnable)} entries with {workers} parallel workers")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _, entries in executor.map(_process_entry_isolated, runnable,
+                                       [outdir] * len(runnable),
+                                       [entry_kwargs] * len(runnable)):
+            for entry in entries:
+                _write_jobdef_json_entry(entry, args.jobdefs)
+
 if __name__ == '__main__':
     main()
@@ -120,13 +120,13 @@ def build_pileup_args(config):
             # Create pileup catalog for this mixer type
             _create_pileup_catalog(datasets, pileup_list)
             # Use the first dataset for MaxEventsToSkip calculation
-            first_dataset = list(datasets.keys())[0]
+            first_dataset = next(iter(datasets))
             nfiles, nevts = get_def_counts(first_dataset)
             skip = nevts // nfiles if nfiles > 0 else 0
             print(f"physics.filters.{mixer}.mu2e.MaxEventsToSkip: {skip}", file=f)
             
             # Use the merge factor from the first dataset as the count
-            cnt = list(datasets.values())[0]
+            cnt = next(iter(datasets.values()))
             # Use the JSON count parameter - mu2ejobdef will select the first cnt files from the full list
             args += ['--auxinput', f"{cnt}:physics.filters.{mixer}.fileNames:{pileup_list}"]
         
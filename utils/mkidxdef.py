@@ -19,11 +19,14 @@ def main():
     
     total_jobs = sum(j['njobs'] for j in jobdefs)
     
+    # One write for the whole listing instead of a print() per entry
+    lines = []
     for i, j in enumerate(jobdefs):
         outputs = ", ".join(f"{o['dataset']}→{o['location']}" for o in j['outputs'])
-        print(f"[{i}] {j['tarball']}: {j['njobs']} jobs, input={j['inloc']}, outputs={outputs}")
-    
-    print(f"\nTotal: {total_jobs} jobs")
+        lines.append(f"[{i}] {j['tarball']}: {j['njobs']} jobs, input={j['inloc']}, outputs={outputs}")
+    lines.append(f"\nTotal: {total_jobs} jobs\n")
+    sys.stdout.write("\n".join(lines))
+    sys.stdout.flush()
     
     if args.prod:
         map_stem = Path(args.jobdefs).stem
@@ -2,6 +2,7 @@
 """SQLAlchemy models for POMS monitoring."""
 
 from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Float
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import os
@@ -97,6 +98,16 @@ class DatasetInfo(Base):
         return None
 
 
+class LocationCache(Base):
+    """Storage location inferred from SAM for an output dataset (db_analyzer),
+    kept across runs so listings skip the lookup while it is fresh."""
+    __tablename__ = 'location_cache'
+
+    dataset = Column(String, primary_key=True)
+    location = Column(String)
+    updated_at = Column(DateTime, default=datetime.now)
+
+
 def get_db_session(db_path=None):
     """Get SQLAlchemy session."""
     if db_path is None:
@@ -106,7 +117,14 @@ def get_db_session(db_path=None):
         db_path = f'sqlite:///{db_path}'
     
     engine = create_engine(db_path, echo=False)
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(
+        engine, tables=[t for t in Base.metadata.sorted_tables if t is not LocationCache.__table__])
+
+    # The location cache is optional: a read-only database without it stays usable
+    try:
+        LocationCache.__table__.create(engine, checkfirst=True)
+    except OperationalError:
+        pass
 
     # Ensure new columns exist when upgrading older databases
     with engine.connect() as conn:
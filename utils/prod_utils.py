@@ -1,4 +1,9 @@
+import bisect
+import codecs
+import fnmatch
+import functools
 import glob
+import itertools
 import json
 import logging
 import os
@@ -10,10 +15,11 @@ import sys
 import tarfile
 import tempfile
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from .jobdef import create_jobdef
-from .job_common import Mu2eName
+from .job_common import Mu2eJobBase, Mu2eName
 from .jobfcl import Mu2eJobFCL
 from .jobiodetail import Mu2eJobIO
 from .jobquery import Mu2eJobPars
@@ -40,6 +46,34 @@ def setup_logging(verbose: bool) -> None:
         # Suppress samweb_client debug messages
         logging.getLogger("samweb_client").setLevel(logging.WARNING)
 
+_STREAM_CHUNK = 1 << 16
+
+
+def _stdout_fd():
+    """sys.stdout's file descriptor, or None when stdout is not backed by one
+    (e.g. redirected to an in-memory buffer)."""
+    try:
+        return sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _copy_stream(src, log_f=None):
+    """Copy a binary pipe to sys.stdout (and `log_f`, if given) in 64 KiB
+    chunks rather than one Python read/print/flush per line."""
+    out = getattr(sys.stdout, 'buffer', None)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in iter(lambda: src.read1(_STREAM_CHUNK), b''):
+        if log_f is not None:
+            log_f.write(chunk)
+        if out is not None:
+            out.write(chunk)
+            out.flush()
+        else:
+            sys.stdout.write(decoder.decode(chunk))
+            sys.stdout.flush()
+
+
 def run(cmd, shell=False, retries=0, retry_delay=60):
     """
     Run a shell command with real-time output streaming.
@@ -47,20 +81,27 @@ def run(cmd, shell=False, retries=0, retry_delay=60):
     retries: number of retry attempts (0 = no retries, just run once)
     retry_delay: seconds to wait between retries
     Returns the exit code (0 for success) or raises CalledProcessError for failure.
+
+    When stdout is a real file the child inherits its fd (stderr merged in),
+    so mu2e output reaches the job log with no Python copy at all; otherwise
+    it is piped through _copy_stream.
     """
     attempts = retries + 1
     for attempt in range(1, attempts + 1):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] Running: {cmd}")
+        # Flush our own buffered prints so they stay ahead of the child's output
+        sys.stdout.flush()
 
-        # Real-time streaming
-        process = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE,
-                                  stderr=subprocess.STDOUT, text=True, bufsize=1)
-        for line in iter(process.stdout.readline, ''):
-            print(line.rstrip())
-            sys.stdout.flush()
-
-        process.stdout.close()
+        out_fd = _stdout_fd()
+        if out_fd is not None:
+            process = subprocess.Popen(cmd, shell=shell, stdout=out_fd,
+                                       stderr=subprocess.STDOUT)
+        else:
+            process = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
+            _copy_stream(process.stdout)
+            process.stdout.close()
         return_code = process.wait()
 
         if return_code == 0:
@@ -91,18 +132,62 @@ def _job_index_from_fname(fname):
     return (int(stripped) if stripped else 0), sequencer
 
 
+def _jobdesc_offsets(jobdesc):
+    """Prefix sums of `njobs` over the normal-mode entries of a jobdesc list.
+    Returns (ends, positions): `ends[k]` is the exclusive upper bound of the
+    k-th counted entry's global job-index range and `positions[k]` is that
+    entry's index in `jobdesc`. Generic tarball entries (no njobs) are
+    skipped, matching validate_jobdesc."""
+    positions = [i for i, entry in enumerate(jobdesc) if 'njobs' in entry]
+    ends = list(itertools.accumulate(jobdesc[i]['njobs'] for i in positions))
+    return ends, positions
+
+
+def _fetch_files_local(filenames, src_location='disk'):
+    """Fetch SAM-registered files from `src_location` to cwd with a single
+    `mdh copy-file` invocation (argv, no shell). Files already present in
+    cwd are skipped; raises RuntimeError if any file is still missing after
+    the copy."""
+    missing = [f for f in filenames if not Path(f).is_file()]
+    if not missing:
+        return
+    run(['mdh', 'copy-file', '-e', '3', '-o', '-v', '-s', src_location, '-l', 'local', *missing],
+        retries=3, retry_delay=60)
+    for filename in missing:
+        if not Path(filename).is_file():
+            raise RuntimeError(f"mdh copy-file did not produce {filename} in cwd")
+
+
 def _fetch_file_local(filename, src_location='disk'):
     """Fetch a SAM-registered file from dCache to cwd via `mdh copy-file`.
     No-op if `filename` is already locally present (basename-relative).
     `src_location` defaults to 'disk' (the cnf-tarball convention, matching
     pushOutput's `disk` destination); pass the actual location for input
     data files."""
-    if Path(filename).is_file():
-        return
-    run(f"mdh copy-file -e 3 -o -v -s {src_location} -l local {filename}",
-        shell=True, retries=3, retry_delay=60)
-    if not Path(filename).is_file():
-        raise RuntimeError(f"mdh copy-file did not produce {filename} in cwd")
+    _fetch_files_local([filename], src_location)
+
+
+@functools.lru_cache(maxsize=8)
+def _jobpars_json(tarball, mtime_ns, size):
+    """Parsed jobpars.json of a cnf tarball, memoized per (path, mtime, size)."""
+    return Mu2eJobBase(tarball).json_data
+
+
+def _tarball_json(tarball):
+    """jobpars.json of `tarball`, opened and parsed at most once per version
+    of the file. The returned dict is shared — callers must not mutate it."""
+    st = os.stat(tarball)
+    return _jobpars_json(tarball, st.st_mtime_ns, st.st_size)
+
+
+def _get_job_pars(tarball):
+    """Mu2eJobPars for `tarball` built on the shared parsed jobpars.json."""
+    return Mu2eJobPars(tarball, json_data=_tarball_json(tarball))
+
+
+def _get_job_io(tarball):
+    """Mu2eJobIO for `tarball` built on the shared parsed jobpars.json."""
+    return Mu2eJobIO(tarball, json_data=_tarball_json(tarball))
 
 
 def _require_fields(entry, required_fields, mode_name):
@@ -119,7 +204,7 @@ def _extract_simjob_setup(tarball):
     via Mu2eJobPars. Re-raises with a clear context line on the realistic
     failure modes (bad tarball, missing key, missing file)."""
     try:
-        jp = Mu2eJobPars(tarball)
+        jp = _get_job_pars(tarball)
         setup = jp.setup()
         print(f"Job setup script: {setup}")
         return setup
@@ -128,9 +213,10 @@ def _extract_simjob_setup(tarball):
         raise
 
 
-def write_fcl(jobdef, inloc='tape', proto='root', index=0, target=None):
+def write_fcl(jobdef, inloc='tape', proto='root', index=0, target=None, json_data=None):
     """
     Generate and write an FCL file using mu2ejobfcl.
+    json_data: already-parsed jobpars.json of `jobdef`, to skip re-reading it.
     """
     # Extract fcl filename from jobdef and write to current directory
     jobdef_name = Path(jobdef).name  # Get just the filename, not the full path
@@ -147,7 +233,7 @@ def write_fcl(jobdef, inloc='tape', proto='root', index=0, target=None):
     print(f"{perl_cmd}")
     
     # Use Python mu2ejobfcl implementation
-    job_fcl = Mu2eJobFCL(jobdef, inloc=inloc, proto=proto)
+    job_fcl = Mu2eJobFCL(jobdef, inloc=inloc, proto=proto, json_data=json_data)
 
     if target:
         job_index = job_fcl.find_index(target=target)
@@ -203,7 +289,7 @@ def calculate_merge_factor(fields):
     if not isinstance(input_data, dict):
         raise ValueError(f"input_data must be a dict, got {type(input_data)}")
     
-    value = list(input_data.values())[0]
+    value = next(iter(input_data.values()))
 
     if isinstance(value, dict):
         if 'split_lines' in value:
@@ -228,20 +314,53 @@ def write_fcl_template(base, overrides):
         base: Base FCL file to include
         overrides: Dictionary of FCL overrides
     """
-    with open('template.fcl', 'w') as f:
-        # Write just the include directive for the base FCL
-        f.write(f'#include "{base}"\n')
-        
-        # Add overrides
-        for key, val in overrides.items():
-            if key == '#include':
-                includes = val if isinstance(val, list) else [val]
-                for inc in includes:
-                    f.write(f'#include "{inc}"\n')
-            else:
-                # Use json.dumps for all values to ensure proper FCL formatting
-                # (strings get quotes, lists get proper syntax with double quotes)
-                f.write(f'{key}: {json.dumps(val)}\n')
+    # Just the include directive for the base FCL, then the overrides
+    lines = [f'#include "{base}"']
+    for key, val in overrides.items():
+        if key == '#include':
+            includes = val if isinstance(val, list) else [val]
+            lines.extend(f'#include "{inc}"' for inc in includes)
+        else:
+            # Use json.dumps for all values to ensure proper FCL formatting
+            # (strings get quotes, lists get proper syntax with double quotes)
+            lines.append(f'{key}: {json.dumps(val)}')
+    content = "\n".join(lines) + "\n"
+    template = Path('template.fcl')
+    # --extend already wrote this exact template for get_output_dataset_names
+    # before build_jobdef asks for it again; don't rewrite identical content.
+    try:
+        if template.read_text() == content:
+            return
+    except OSError:
+        pass
+    template.write_text(content)
+
+@contextmanager
+def scratch_cwd(outdir, prefix, keep=()):
+    """Run the body in a private scratch dir under `outdir`.
+
+    For process-pool workers whose build steps write fixed names (template.fcl,
+    inputs.txt, ...) into cwd. The body may extend the yielded `keep` list;
+    on success each kept name is moved back into `outdir` (a directory's
+    entries are merged into `outdir/<name>/`). The scratch dir is always
+    removed.
+    """
+    workdir = tempfile.mkdtemp(prefix=prefix, dir=outdir)
+    keep = list(keep)
+    os.chdir(workdir)
+    try:
+        yield keep
+        for name in keep:
+            if os.path.isdir(name):
+                os.makedirs(os.path.join(outdir, name), exist_ok=True)
+                with os.scandir(name) as it:
+                    for entry in it:
+                        os.replace(entry.path, os.path.join(outdir, name, entry.name))
+            elif os.path.exists(name):
+                os.replace(name, os.path.join(outdir, name))
+    finally:
+        os.chdir(outdir)
+        shutil.rmtree(workdir, ignore_errors=True)
 
 def replace_file_extensions(input_str, first_field, last_field):
     """Replace the tier and extension fields of a Mu2e dot-name."""
@@ -398,14 +517,11 @@ def process_template(jobdesc_entry, fname):
     # Extract base name from input file (e.g., dig.mu2e.CosmicSignalTriggered.MDC2025ad.001430_00000000.art -> dig.mu2e.CosmicSignalTriggered.MDC2025ad.001430_00000000)
     input_basename = Path(fname).stem  # Remove .art extension
     fcl = f'{input_basename}.fcl'
-    with open(fcl, 'w') as f:
-        f.write(fcl_content)
-        f.write("\n# Template overrides:\n")
-        f.write(f'source.fileNames: ["{fname}"]\n')
-        for key, pattern in output_patterns.items():
-            # Replace all template variables in the pattern
-            output_filename = pattern.format(**template_vars)
-            f.write(f'{key}: "{output_filename}"\n')
+    lines = [fcl_content + "\n# Template overrides:", f'source.fileNames: ["{fname}"]']
+    # Replace all template variables in each output pattern
+    lines.extend(f'{key}: "{pattern.format(**template_vars)}"'
+                 for key, pattern in output_patterns.items())
+    Path(fcl).write_text("\n".join(lines) + "\n")
     
     print(f"Template vars: {template_vars}")
     print(f"FCL: {fcl}")
@@ -500,23 +616,15 @@ def process_jobdef(jobdesc, fname, args):
         sys.exit(1)
     
     # Find which job description this job index belongs to
-    cumulative_jobs = 0
-    jobdesc_entry = None
-    jobdesc_index = None
-    
-    for i, entry in enumerate(jobdesc):
-        if 'njobs' not in entry:
-            continue  # skip generic tarball entries
-        if job_index < cumulative_jobs + entry['njobs']:
-            jobdesc_entry = entry
-            jobdesc_index = i
-            break
-        cumulative_jobs += entry['njobs']
-    
-    if jobdesc_entry is None:
-        total_jobs = sum(d.get('njobs', 0) for d in jobdesc)
+    ends, positions = _jobdesc_offsets(jobdesc)
+    k = bisect.bisect_right(ends, job_index)
+    if k == len(ends):
+        total_jobs = ends[-1] if ends else 0
         print(f"Error: Job index {job_index} out of range. Total jobs available: {total_jobs}")
         sys.exit(1)
+    jobdesc_index = positions[k]
+    jobdesc_entry = jobdesc[jobdesc_index]
+    cumulative_jobs = ends[k - 1] if k else 0
     
     print(f"Job {job_index} uses definition {jobdesc_index}")
     print(f"Global job index: {job_index}, Local job index within definition: {job_index - cumulative_jobs}")
@@ -537,8 +645,8 @@ def process_jobdef(jobdesc, fname, args):
     # in cwd. Every job's FCL references local_filename (set via
     # fcl_overrides at jobdef-creation time), so mu2e reads whatever that
     # file contains when it opens.
-    jp_for_chunk = Mu2eJobPars(tarball)
-    tbs = jp_for_chunk.json_data.get('tbs', {}) if isinstance(jp_for_chunk.json_data, dict) else {}
+    jobpars = _tarball_json(tarball)
+    tbs = jobpars.get('tbs', {}) if isinstance(jobpars, dict) else {}
     chunk_mode = tbs.get('chunk_mode') if isinstance(tbs, dict) else None
     if isinstance(chunk_mode, dict):
         src = chunk_mode['source']
@@ -547,14 +655,13 @@ def process_jobdef(jobdesc, fname, args):
         start = job_index_num * lines_per_chunk + 1
         end = start + lines_per_chunk - 1
         print(f"chunk_mode: extracting lines {start}-{end} of {src} -> {local_name}")
-        # Quote paths — they come from jobpars (cvmfs today, but future
-        # configs might contain whitespace or shell metacharacters).
-        sed_range = f"{start},{end}p"
-        cmd = f"sed -n {shlex.quote(sed_range)} {shlex.quote(src)} > {shlex.quote(local_name)}"
-        run(cmd, shell=True)
+        # Equivalent of `sed -n '<start>,<end>p' src > local_name`, done in
+        # Python so no shell has to parse the jobpars-supplied paths.
+        with open(src, 'rb') as fin, open(local_name, 'wb') as fout:
+            fout.writelines(itertools.islice(fin, start - 1, end))
 
     # List input files
-    job_io = Mu2eJobIO(tarball)
+    job_io = _get_job_io(tarball)
     inputs = job_io.job_inputs(job_index_num)
     # Flatten the dictionary values into a single list
     all_files = []
@@ -566,19 +673,28 @@ def process_jobdef(jobdesc, fname, args):
     # Stash files are on CVMFS and resilient files use xrootd — no local copying needed
     if args.copy_input and infiles.strip() and inloc not in ("none", "stash", "resilient"):
         print(f"Copying input files locally from {inloc}: {infiles}")
-        fcl = write_fcl(tarball, f"dir:{os.getcwd()}/indir", 'file', job_index_num)
+        fcl = write_fcl(tarball, f"dir:{os.getcwd()}/indir", 'file', job_index_num,
+                        json_data=jobpars)
         
-        # Copy each file individually, detecting actual location from SAMWeb
-        run("echo 'Starting to copy input files locally'", shell=True)
-        for file in all_files:
+        # Detect each file's actual location from SAMWeb, then copy with one
+        # mdh invocation per location rather than one per file. A file listed
+        # under several inputs is fetched and moved once.
+        print("Starting to copy input files locally")
+        unique_files = list(dict.fromkeys(all_files))
+        by_location = {}
+        for file in unique_files:
             locations = locate_file_full(file)
             if not locations or 'location_type' not in locations[0]:
                 raise RuntimeError(f"Could not detect location for file: {file}")
             file_inloc = locations[0]['location_type']
             print(f"Detected location of {file}: {file_inloc}")
-            print(f"Copying {file} from {file_inloc}")
-            _fetch_file_local(file, src_location=file_inloc)
-        run(f"mkdir indir; mv *.art indir/", shell=True)
+            by_location.setdefault(file_inloc, []).append(file)
+        for file_inloc, files in by_location.items():
+            print(f"Copying {len(files)} file(s) from {file_inloc}")
+            _fetch_files_local(files, src_location=file_inloc)
+        os.makedirs('indir', exist_ok=True)
+        for file in unique_files:
+            os.replace(file, os.path.join('indir', file))
         print(f"FCL: {fcl}")
     # Generate FCL - Normal mode with streaming inputs
     else:
@@ -587,7 +703,7 @@ def process_jobdef(jobdesc, fname, args):
         # so use the 'file' protocol (direct POSIX read) for dir: mode.
         proto = 'file' if inloc.startswith('dir:') else 'root'
         print(f"Using streaming inputs from {inloc} (protocol: {proto})")
-        fcl = write_fcl(tarball, inloc, proto, job_index_num)
+        fcl = write_fcl(tarball, inloc, proto, job_index_num, json_data=jobpars)
         print(f"FCL: {fcl}")
     
     # Extract setup script from tarball
@@ -721,19 +837,41 @@ def process_g4bl_jobdef(jobdesc_entry, fname, args):
 
     # Stream g4bl stdout/stderr to BOTH the runner's stdout AND the SAM log
     # file. Real-time visibility for the operator + persisted log for SAM push.
+    sys.stdout.flush()
     proc = subprocess.Popen(cmd_list, stdout=subprocess.PIPE,
-                            stderr=subprocess.STDOUT, text=True, bufsize=1)
-    with open(log_path, 'w') as log_f:
-        for line in proc.stdout:
-            log_f.write(line)
-            sys.stdout.write(line)
-            sys.stdout.flush()
+                            stderr=subprocess.STDOUT)
+    with open(log_path, 'wb') as log_f:
+        _copy_stream(proc.stdout, log_f)
     proc.stdout.close()
     rc = proc.wait()
 
     return jobdesc_entry['outputs'], histo_file, log_file, (rc == 0)
 
 
+def _list_cwd_files():
+    """Sorted names of the regular files in cwd, from a single os.scandir."""
+    with os.scandir('.') as it:
+        return sorted(entry.name for entry in it if entry.is_file())
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_pattern(pattern):
+    """Compiled matcher for a glob `pattern`; outputs[] patterns repeat
+    across configs, so each is translated once per process."""
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def _match_local(pattern, local_files):
+    """Files matching a glob `pattern`, resolved against a `_list_cwd_files`
+    snapshot; patterns with a directory component fall back to glob.glob.
+    Like glob, a wildcard doesn't match a leading '.'."""
+    if os.sep in pattern:
+        return glob.glob(pattern)
+    match = _compile_pattern(pattern)
+    hidden_ok = pattern.startswith('.')
+    return [n for n in local_files if match(n) and (hidden_ok or not n.startswith('.'))]
+
+
 def push_output(output_specs, output_file="output.txt", parents_file="parents_list.txt", simjob_setup=None):
     """
     Generic function to push output files.
@@ -748,13 +886,15 @@ def push_output(output_specs, output_file="output.txt", parents_file="parents_li
         int: Exit code from pushOutput command
     """
 
+    local_files = _list_cwd_files()
+    local_set = set(local_files)
     output_lines = []
     for spec in output_specs:
         location, pattern, parents = spec
         # Handle glob patterns
-        matching_files = glob.glob(pattern) if '*' in pattern else [pattern]
+        matching_files = _match_local(pattern, local_files) if '*' in pattern else [pattern]
         for filename in matching_files:
-            if Path(filename).exists():
+            if filename in local_set or Path(filename).exists():
                 output_lines.append(f"{location} {filename} {parents}")
             else:
                 print(f"Warning: File not found: {filename}")
@@ -765,10 +905,12 @@ def push_output(output_specs, output_file="output.txt", parents_file="parents_li
     
     Path(output_file).write_text("\n".join(output_lines) + "\n")
     print(f"Pushing {len(output_lines)} file(s) via {output_file}")
-    push_cmd = f"pushOutput {output_file}"
+    # argv form: no /bin/sh in between. The setup script has to be sourced,
+    # so that case runs one bash explicitly (as build_mu2e_cmd does).
+    push_cmd = ['pushOutput', output_file]
     if simjob_setup:
-        push_cmd = f"source {simjob_setup} && {push_cmd}"
-    result = run(push_cmd, shell=True)
+        push_cmd = ['bash', '-c', f"source {shlex.quote(simjob_setup)} && {shlex.join(push_cmd)}"]
+    result = run(push_cmd)
     if result != 0:
         print(f"Warning: pushOutput returned exit code {result}")
     return result
@@ -794,12 +936,15 @@ def push_data(outputs, infiles, simjob_setup=None, track_parents=True):
     if track_parents:
         Path("parents_list.txt").write_text(infiles.replace(" ", "\n") + "\n")
 
-    # Build output specifications
+    # Build output specifications. Outputs land in cwd, so list it once and
+    # match every pattern against that listing rather than re-scanning the
+    # directory with one glob.glob per output dataset.
+    local_files = _list_cwd_files()
     output_specs = []
     for output in outputs:
         dataset_pattern = output['dataset']
         location = output['location']
-        matching_files = glob.glob(dataset_pattern)
+        matching_files = _match_local(dataset_pattern, local_files)
         print(f"Pattern '{dataset_pattern}' matched {len(matching_files)} files: {matching_files}")
         for filename in matching_files:
             output_specs.append((location, filename, parents_field))
@@ -176,6 +176,10 @@ def locate_file_full(filename: str) -> List[Dict]:
     """Locate a file and return full location details."""
     return get_samweb_wrapper().locate_file_full(filename)
 
+def locate_files(filenames: List[str]) -> Dict[str, List[Dict]]:
+    """Locate multiple files in one request."""
+    return get_samweb_wrapper().locate_files(filenames)
+
 def create_definition(definition_name: str, query: str) -> None:
     """Create a definition. Raises on failure."""
     get_samweb_wrapper().create_definition(definition_name, query)
@@ -25,15 +25,17 @@ Usage
     copy_dataset_to_stash("dts.mu2e.CeEndpoint.Run1Bab.art", source_loc="disk")
 """
 
+import functools
 import os
-import subprocess
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.job_common import Mu2eName, remove_storage_prefix
-from utils.samweb_wrapper import list_files, locate_file_full
+from utils.job_common import Mu2eName, remove_storage_prefix, env_threads, locate_files_batched
+from utils.samweb_wrapper import list_files, locate_files
 
 
 # ---------------------------------------------------------------------------
@@ -60,11 +62,15 @@ def stash_write_root() -> str:
 # Path builders
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=4096)
 def _subpath(filename: str) -> str:
     """
     Return the dataset-derived sub-path for a file, relative to the stash root.
 
     Format: datasets/<tier>/<owner>/<description>/<dsconf>/<ext>/<filename>
+
+    Cached per filename: it does not depend on the root, so the read/write/
+    resilient builders share one parse and still honour env changes.
     """
     ds_path = str(Mu2eName.parse(filename).dataset).replace('.', '/')
     return f"datasets/{ds_path}/{filename}"
@@ -105,7 +111,8 @@ def copy_dataset_to_stash(
     """
     Copy all files in a SAM dataset to their stash write locations.
 
-    Files are copied with `cp`.  The source path is obtained from SAM for
+    Files are copied with shutil.copyfile, MU2E_STASH_COPY_THREADS (default
+    8) at a time.  The source path is obtained from SAM for
     the requested source_loc ('disk' or 'tape').  For tape sources the file
     must already be staged to disk (dcache); this function does not trigger
     staging.
@@ -122,6 +129,33 @@ def copy_dataset_to_stash(
     -------
     Number of files successfully copied.
     """
+    return _copy_dataset(dataset, write_path_for_file, source_loc, limit, dry_run, verbose)
+
+
+def _source_path(filename: str, locations: List[dict], source_loc: str) -> str:
+    """Path of `filename` among its SAM `locations`, preferring `source_loc`;
+    raises if none."""
+    preferred = [loc for loc in locations if loc.get('location_type') == source_loc]
+    chosen = preferred[0] if preferred else (locations[0] if locations else None)
+    if not chosen:
+        raise ValueError("no locations returned")
+    src = remove_storage_prefix(chosen.get('full_path', ''))
+    if not src:
+        raise ValueError("empty path in location record")
+    if not src.endswith(filename):
+        src = f"{src.rstrip('/')}/{filename}"
+    return src
+
+
+def _copy_dataset(dataset, dest_for, source_loc, limit, dry_run, verbose) -> int:
+    """Shared body of copy_dataset_to_stash/_resilient; `dest_for` maps a
+    filename to its destination path.
+
+    Sources are located up front in batched SAM requests. Copies are
+    I/O-bound on dCache and every file has its own destination, so they run
+    on a thread pool; a file that fails to locate or copy is reported and
+    skipped. dry_run stays serial and never starts the pool.
+    """
     files = list_files(f"dh.dataset {dataset}")
     if not files:
         raise ValueError(f"No files found in SAM for dataset: {dataset}")
@@ -130,48 +164,43 @@ def copy_dataset_to_stash(
     if limit is not None:
         files = files[:limit]
 
-    n_ok = 0
-    n_fail = 0
+    locations = locate_files_batched(locate_files, files)
 
-    for filename in files:
-        dest = write_path_for_file(filename)
-        dest_dir = os.path.dirname(dest)
+    def copy_one(filename: str) -> bool:
+        dest = dest_for(filename)
 
         # Get source path from SAM, filtering by requested location type
         try:
-            locations = locate_file_full(filename)
-            preferred = [loc for loc in locations if loc.get('location_type') == source_loc]
-            chosen = preferred[0] if preferred else (locations[0] if locations else None)
-            if not chosen:
-                raise ValueError(f"no locations returned")
-            src = remove_storage_prefix(chosen.get('full_path', ''))
-            if not src:
-                raise ValueError(f"empty path in location record")
-            if not src.endswith(filename):
-                src = f"{src.rstrip('/')}/{filename}"
+            src = _source_path(filename, locations.get(filename) or [], source_loc)
         except Exception as e:
             print(f"  SKIP {filename}: could not locate ({e})", file=sys.stderr)
-            n_fail += 1
-            continue
+            return False
 
         if verbose or dry_run:
             action = "would cp" if dry_run else "cp"
             print(f"  {action}: {src} -> {dest}")
 
         if dry_run:
-            n_ok += 1
-            continue
+            return True
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        # Copy file in-process (sendfile on Linux) rather than forking a cp
+        try:
+            shutil.copyfile(src, dest)
+        except OSError as e:
+            print(f"  FAIL {filename}: {e}", file=sys.stderr)
+            return False
+        return True
 
-        # Create destination directory
-        os.makedirs(dest_dir, exist_ok=True)
+    if dry_run:
+        results = [copy_one(f) for f in files]
+    else:
+        with ThreadPoolExecutor(max_workers=env_threads("MU2E_STASH_COPY_THREADS")) as executor:
+            results = list(executor.map(copy_one, files))
 
-        # Copy file
-        result = subprocess.run(["cp", src, dest], capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"  FAIL {filename}: {result.stderr.strip()}", file=sys.stderr)
-            n_fail += 1
-        else:
-            n_ok += 1
+    n_ok = sum(results)
+    n_fail = len(results) - n_ok
 
     if verbose:
         status = "dry-run" if dry_run else "done"
@@ -222,56 +251,4 @@ def copy_dataset_to_resilient(
     -------
     Number of files successfully copied.
     """
-    files = list_files(f"dh.dataset {dataset}")
-    if not files:
-        raise ValueError(f"No files found in SAM for dataset: {dataset}")
-
-    files = sorted(files)
-    if limit is not None:
-        files = files[:limit]
-
-    n_ok = 0
-    n_fail = 0
-
-    for filename in files:
-        dest = resilient_path_for_file(filename)
-        dest_dir = os.path.dirname(dest)
-
-        try:
-            locations = locate_file_full(filename)
-            preferred = [loc for loc in locations if loc.get('location_type') == source_loc]
-            chosen = preferred[0] if preferred else (locations[0] if locations else None)
-            if not chosen:
-                raise ValueError("no locations returned")
-            src = remove_storage_prefix(chosen.get('full_path', ''))
-            if not src:
-                raise ValueError("empty path in location record")
-            if not src.endswith(filename):
-                src = f"{src.rstrip('/')}/{filename}"
-        except Exception as e:
-            print(f"  SKIP {filename}: could not locate ({e})", file=sys.stderr)
-            n_fail += 1
-            continue
-
-        if verbose or dry_run:
-            action = "would cp" if dry_run else "cp"
-            print(f"  {action}: {src} -> {dest}")
-
-        if dry_run:
-            n_ok += 1
-            continue
-
-        os.makedirs(dest_dir, exist_ok=True)
-
-        result = subprocess.run(["cp", src, dest], capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"  FAIL {filename}: {result.stderr.strip()}", file=sys.stderr)
-            n_fail += 1
-        else:
-            n_ok += 1
-
-    if verbose:
-        status = "dry-run" if dry_run else "done"
-        print(f"\n{status}: {n_ok} copied, {n_fail} failed out of {len(files)} files")
-
-    return n_ok
+    return _copy_dataset(dataset, resilient_path_for_file, source_loc, limit, dry_run, verbose)